@@ -0,0 +1,112 @@
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+
+DEFAULT_RUNS_DIR = '~/.cache/can-you/runs'
+
+# Cap stored command output so run files stay small
+MAX_OUTPUT_CHARS = 64 * 1024
+
+
+class RunCheckpoint:
+    """
+    Persistent record of a long-mode run: the plan, and for every step the
+    generated commands, outputs, exit codes and timings. Written to
+    <runs_dir>/<run_id>/run.json after every change so an interrupted
+    run can be resumed with --resume RUN_ID.
+    """
+
+    def __init__(self, run_id, run_dir, data):
+        self.run_id = run_id
+        self.run_dir = run_dir
+        self.data = data
+
+    @classmethod
+    def create(cls, task_description, plan, runs_dir=DEFAULT_RUNS_DIR):
+        """Start a new run directory for a freshly created plan"""
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        run_dir = Path(os.path.expanduser(runs_dir)) / run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        data = {
+            "run_id": run_id,
+            "task": task_description,
+            "plan": plan,
+            "status": "running",
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "steps": {}
+        }
+        checkpoint = cls(run_id, run_dir, data)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_id, runs_dir=DEFAULT_RUNS_DIR):
+        """Load an existing run, or return None if it does not exist"""
+        run_dir = Path(os.path.expanduser(runs_dir)) / run_id
+        run_file = run_dir / 'run.json'
+        if not run_file.exists():
+            return None
+        with open(run_file, 'r') as f:
+            data = json.load(f)
+        return cls(run_id, run_dir, data)
+
+    def save(self):
+        """Atomically rewrite run.json"""
+        self.data["updated_at"] = time.time()
+        tmp_file = self.run_dir / 'run.json.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_file, self.run_dir / 'run.json')
+
+    @property
+    def task(self):
+        return self.data["task"]
+
+    @property
+    def plan(self):
+        return self.data["plan"]
+
+    def _step(self, index):
+        return self.data["steps"].setdefault(str(index), {})
+
+    def is_completed(self, index):
+        return self.data["steps"].get(str(index), {}).get("status") == "completed"
+
+    def cached_commands(self, index):
+        """Parsed LLM response (commands, explanation, ...) saved for a step"""
+        return self.data["steps"].get(str(index), {}).get("response")
+
+    def start_step(self, index):
+        step = self._step(index)
+        step["status"] = "running"
+        step["started_at"] = time.time()
+        self.save()
+
+    def record_commands(self, index, response):
+        """Save a step's generated commands before they are executed"""
+        self._step(index)["response"] = response
+        self.save()
+
+    def record_outcome(self, index, outcome, completed):
+        """Save a step's execution outcome and timing"""
+        step = self._step(index)
+        step["status"] = "completed" if completed else (outcome or {}).get("status", "failed")
+        step["duration_seconds"] = round(time.time() - step.get("started_at", time.time()), 3)
+        executions = []
+        for execution in (outcome or {}).get("executions", []):
+            execution = dict(execution)
+            for stream in ("stdout", "stderr"):
+                if len(execution.get(stream) or "") > MAX_OUTPUT_CHARS:
+                    execution[stream] = execution[stream][-MAX_OUTPUT_CHARS:]
+            executions.append(execution)
+        step["executions"] = executions
+        if outcome and outcome.get("error"):
+            step["error"] = outcome["error"]
+        self.save()
+
+    def finish(self, status):
+        self.data["status"] = status
+        self.save()
@@ -0,0 +1,60 @@
+import json
+
+DUPLICATE_NOTE = {
+    "duplicate": "This exact call was already answered earlier in this task and nothing has changed; "
+                 "use that result instead of asking again."
+}
+
+
+def call_fingerprint(function_name, arguments):
+    """Identity of a tool call: name plus canonical arguments"""
+    return f"{function_name}:{json.dumps(arguments, sort_keys=True, separators=(',', ':'))}"
+
+
+class ConvergenceTracker:
+    """
+    Tracks the tool calls of one task to spot a model that stopped making
+    progress. A repeated (tool, arguments) pair is answered with a short
+    note instead of running the tool again. A round counts as stalled when
+    every call in it repeats an earlier one (which also catches
+    ping-ponging between two tools); after `stall_limit` stalled rounds in
+    a row the executor forces a final answer.
+    """
+
+    def __init__(self, stall_limit=2):
+        self.stall_limit = stall_limit
+        self.seen = set()
+        self.rounds = 0
+        self.duplicates = 0    # tool calls answered without running
+        self.stalled = 0       # consecutive stalled rounds
+        self.forced = False
+        self._new_calls = 0
+
+    def check(self, function_name, arguments):
+        """Record a call in the current round; True if it repeats an earlier one"""
+        fingerprint = call_fingerprint(function_name, arguments)
+        if fingerprint in self.seen:
+            self.duplicates += 1
+            return True
+        self.seen.add(fingerprint)
+        self._new_calls += 1
+        return False
+
+    def end_round(self):
+        """Close the current tool round; True when a final answer should be forced"""
+        self.rounds += 1
+        self.stalled = self.stalled + 1 if self._new_calls == 0 else 0
+        self._new_calls = 0
+        return self.stall_limit > 0 and self.stalled >= self.stall_limit
+
+    def report(self, iteration, max_iterations):
+        """Summary line of what convergence tracking saved, or None"""
+        if not self.duplicates and not self.forced:
+            return None
+        parts = []
+        if self.duplicates:
+            parts.append(f"answered {self.duplicates} repeated tool call(s) from earlier results")
+        if self.forced:
+            parts.append(f"forced a final answer after {self.stall_limit} stalled round(s), "
+                         f"saving up to {max_iterations - iteration} round trip(s)")
+        return "; ".join(parts)
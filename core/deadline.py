@@ -0,0 +1,36 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    """The overall time budget ran out"""
+
+
+class Deadline:
+    """
+    Overall time budget for a task (`--deadline`). Every layer sizes its own
+    timeouts from what is left: LLM requests, retries and backoff, tool
+    calls and each command run.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default, minimum=0.5):
+        """The smaller of a layer's usual timeout and the remaining budget"""
+        return max(minimum, min(default, self.remaining()))
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded during {stage}")
+
+
+def budget(deadline, default, minimum=0.5):
+    """Timeout for one operation: the default, capped by the deadline if there is one"""
+    return deadline.timeout(default, minimum) if deadline is not None else default
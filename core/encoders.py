@@ -0,0 +1,133 @@
+import json
+import re
+from core.metrics import current_metrics
+
+# Terminal formatting left in man/--help output
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+OVERSTRIKE = re.compile(r'.\x08')
+BLANK_RUNS = re.compile(r'\n{3,}')
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/code)"""
+    return (len(text) + 3) // 4
+
+
+def _compact_json(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def encode_text(result):
+    """Send strings as-is instead of JSON-escaping every newline and quote"""
+    if isinstance(result, str):
+        return result
+    return _compact_json(result)
+
+
+def encode_manual(result):
+    """
+    Man/--help output: drop overstrike bold/underline and ANSI codes, trailing
+    whitespace and blank-line runs, and shrink the deep indentation man uses.
+    """
+    if not isinstance(result, str):
+        return _compact_json(result)
+    text = ANSI_ESCAPE.sub('', OVERSTRIKE.sub('', result))
+    lines = []
+    for line in text.split('\n'):
+        line = line.rstrip()
+        stripped = line.lstrip(' ')
+        indent = len(line) - len(stripped)
+        # Keep relative nesting but at a quarter of the width
+        lines.append(' ' * ((indent + 3) // 4) + stripped)
+    return BLANK_RUNS.sub('\n\n', '\n'.join(lines)).strip('\n')
+
+
+def _table(rows, columns):
+    """Columnar encoding: one header line, then one |-separated row per item"""
+    def cell(value):
+        if value is True:
+            return 'y'
+        if value is False:
+            return 'n'
+        if value is None:
+            return ''
+        return str(value)
+    lines = ['|'.join(columns)]
+    for row in rows:
+        lines.append('|'.join(cell(row.get(column)) for column in columns))
+    return '\n'.join(lines)
+
+
+def encode_probe_paths(result):
+    """probe_paths: a table instead of repeating every key for every path"""
+    if not isinstance(result, dict) or 'results' not in result:
+        return _compact_json(result)
+    rows = []
+    for probe in result['results']:
+        row = dict(probe)
+        row['rwx'] = ''.join(
+            flag if probe.get(key) else '-'
+            for flag, key in (('r', 'readable'), ('w', 'writable'), ('x', 'executable'))
+        ) if probe.get('exists') else ''
+        if not probe.get('exists'):
+            row['type'] = 'broken-symlink' if probe.get('broken_symlink') else 'missing'
+            row['can_create'] = probe.get('can_create')
+        rows.append(row)
+    text = _table(rows, ['path', 'type', 'size_bytes', 'mode', 'owner', 'rwx', 'is_symlink', 'can_create'])
+    if result.get('truncated'):
+        text += '\n(truncated)'
+    return text
+
+
+def encode_search_files(result):
+    """search_files: matches as a table"""
+    if not isinstance(result, dict) or 'matches' not in result:
+        return _compact_json(result)
+    header = f"pattern={result['pattern']} root={result['root']} count={result['count']} source={result['source']}"
+    rows = [dict(m, type='d' if m.get('is_directory') else 'f') for m in result['matches']]
+    text = header + '\n' + _table(rows, ['path', 'type', 'size_bytes', 'mtime'])
+    if result.get('truncated'):
+        text += f"\n(showing {len(rows)} of {result['count']})"
+    return text
+
+
+def encode_list_processes(result):
+    """list_processes: a summary line, then the processes as a table"""
+    if not isinstance(result, dict) or 'processes' not in result:
+        return _compact_json(result)
+    header = (f"total={result['total_processes']} matched={result['matched']} "
+              f"sort={result['sort_by']} cpu={result['cpu_percent_basis']}")
+    return header + '\n' + _table(
+        result['processes'],
+        ['pid', 'ppid', 'user', 'rss_mb', 'mem_percent', 'cpu_percent', 'state', 'threads', 'name', 'cmd']
+    )
+
+
+# Per-tool encoders; anything not listed uses encode_text
+ENCODERS = {
+    'get_man_page': encode_manual,
+    'get_command_help': encode_manual,
+    'get_file_tree': encode_text,
+    'probe_paths': encode_probe_paths,
+    'search_files': encode_search_files,
+    'list_processes': encode_list_processes,
+}
+
+
+def encode_tool_result(function_name, result):
+    """
+    Encode a tool result for the conversation, recording the estimated
+    token count against what plain json.dumps would have produced in the
+    run's metrics.
+    """
+    encoder = ENCODERS.get(function_name, encode_text)
+    try:
+        encoded = encoder(result)
+    except Exception:
+        encoded = _compact_json(result)
+
+    before = estimate_tokens(json.dumps(result))
+    after = estimate_tokens(encoded)
+    metrics = current_metrics()
+    if metrics:
+        metrics.record_tool_encoding(before, after)
+    return encoded
@@ -1,31 +1,95 @@
 import json
-import subprocess
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from core.llm_client import LLMClient
+from core.governor import ExecutionPolicy, format_usage
+from core.metrics import current_metrics
+from core.convergence import ConvergenceTracker, DUPLICATE_NOTE
+from core.task_memory import TaskMemory, path_params
+from core.plan_cache import extract_template
+from core.shared_cache import cache_key, file_version
+from core.deadline import DeadlineExceeded, budget
+from core.singleflight import TOOL_FLIGHTS
+from core.tool_registry import ToolRegistry
 from tools.system_info import (
     get_file_tree,
     check_port_in_use,
     get_disk_space,
+    query_packages,
     check_file_exists,
+    probe_paths,
     get_platform_info,
     build_shell_command,
+    DPKG_STATUS,
+    APK_INSTALLED,
+    RPM_SQLITE,
+    RPM_SQLITE_ALT,
 )
 from tools.man_pages import get_man_page, get_command_help
-from tools.file_ops import read_config_file, check_write_permission
-from tools.validation import validate_command_safety
+from tools.file_ops import read_config_file, check_write_permission, find_config_files
+from tools.file_index import search_files
+from tools.command_catalog import available_commands, get_command_catalog
+from tools.processes import list_processes
+from tools.validation import validate_command_safety, is_destructive
+
+# Longest a single command may run (less when the task's deadline is closer)
+COMMAND_TIMEOUT_SECONDS = 300
 
 # Tool function mapping
 TOOL_FUNCTIONS = {
     "get_man_page": get_man_page,
     "get_command_help": get_command_help,
+    "available_commands": available_commands,
     "get_file_tree": get_file_tree,
     "check_file_exists": check_file_exists,
+    "probe_paths": probe_paths,
     "read_config_file": read_config_file,
     "check_port_in_use": check_port_in_use,
     "get_disk_space": get_disk_space,
+    "query_packages": query_packages,
+    "list_processes": list_processes,
     "check_write_permission": check_write_permission,
+    "search_files": search_files,
+    "find_config_files": find_config_files,
+}
+
+def _command_version(arguments):
+    info = get_command_catalog().lookup(str(arguments.get('command', '')))
+    return f"{info['path']}:{info['size']}:{info['mtime']}" if info else 'missing'
+
+
+def _path_version(arguments):
+    # Installing or removing a command changes its PATH directory's mtime
+    return '|'.join(file_version(d) for d in os.environ.get('PATH', '').split(os.pathsep) if d)
+
+
+def _packages_version(arguments):
+    return '|'.join(file_version(p) for p in (DPKG_STATUS, APK_INSTALLED, RPM_SQLITE, RPM_SQLITE_ALT))
+
+
+# Tools whose results are shared between processes through the host-wide cache:
+# name -> (ttl seconds or None, version of what the result was derived from).
+# Tools reporting live state (ports, disk, processes, permissions) are not cached,
+# nor are those reading whole directory trees, which no single mtime versions.
+TOOL_CACHE_POLICY = {
+    "get_man_page": (7 * 86400, _command_version),
+    "get_command_help": (7 * 86400, _command_version),
+    "available_commands": (300, _path_version),
+    "read_config_file": (None, lambda a: file_version(a.get('path', ''))),
+    "query_packages": (None, _packages_version),
 }
 
+# Terminal tool: calling it delivers the final answer instead of fenced JSON
+SUBMIT_TOOL_NAME = "submit_commands"
+
+# Sent when the model keeps repeating tool calls without learning anything new
+FINAL_ANSWER_PROMPT = (
+    "You are repeating tool calls that were already answered, so more tools will not add information. "
+    f"Using what you have gathered so far, call {SUBMIT_TOOL_NAME} now with your final answer."
+)
+
 # Tool definitions for LLM
 TOOL_DEFINITIONS = [
     {
@@ -56,11 +120,33 @@ TOOL_DEFINITIONS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "available_commands",
+            "description": "Check whether commands are installed, e.g. ['nginx', 'docker', 'rsync']. Instant; use it before suggesting a command or package.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "commands": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Command names to look up"
+                    },
+                    "include_version": {
+                        "type": "boolean",
+                        "description": "Also report each installed command's version by running it with --version (slower; only when the version matters)"
+                    }
+                },
+                "required": ["commands"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
             "name": "get_file_tree",
-            "description": "Get the directory structure of a path to understand what files/folders exist.",
+            "description": "Get the directory structure of a path to understand what files/folders exist. Each line is a directory (relative to the root) followed by its space-separated entries; subdirectories end with '/', and names containing spaces or quotes are JSON-quoted.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -85,6 +171,24 @@ TOOL_DEFINITIONS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "probe_paths",
+            "description": "Check many paths at once: existence, type, size, mode, owner and read/write/execute access for each. Prefer this over repeated check_file_exists/check_write_permission calls when a command touches several paths.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "paths": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "File or directory paths to check"
+                    }
+                },
+                "required": ["paths"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -128,6 +232,45 @@ TOOL_DEFINITIONS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_packages",
+            "description": "Check which packages are installed (dpkg/apk/rpm) and their versions, by exact name and/or name prefix. Use before suggesting to install anything.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "names": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Exact package names to look up (e.g. ['nginx', 'python3'])"
+                    },
+                    "prefix": {"type": "string", "description": "List installed packages whose name starts with this (e.g. 'python3-')"}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_processes",
+            "description": "Snapshot running processes (read from /proc) with memory and CPU usage, filtered and sorted server-side; returns only the top N. Use instead of asking the user to run ps/top.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "sort_by": {"type": "string", "enum": ["rss", "cpu", "pid", "user", "name"], "description": "Sort key (default: 'rss', largest first)"},
+                    "limit": {"type": "integer", "description": "Number of processes to return (default: 20)"},
+                    "user": {"type": "string", "description": "Only processes owned by this user name or uid"},
+                    "name": {"type": "string", "description": "Only processes whose name or command line contains this"},
+                    "min_rss_mb": {"type": "number", "description": "Only processes using at least this much resident memory"},
+                    "min_cpu_percent": {"type": "number", "description": "Only processes using at least this much CPU"},
+                    "cpu_sample_seconds": {"type": "number", "description": "Measure current CPU over this interval (max 5) instead of the lifetime average"}
+                },
+                "required": []
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -141,6 +284,72 @@ TOOL_DEFINITIONS = [
                 "required": ["path"]
             }
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_files",
+            "description": "Search for files/directories by glob (e.g. '*.conf', 'nginx/*.conf') or substring (e.g. 'nginx'). Much faster than exploring with get_file_tree when you know roughly what you are looking for.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {"type": "string", "description": "Glob pattern or substring to match"},
+                    "root": {"type": "string", "description": "Directory to search under (default: current directory)"},
+                    "max_results": {"type": "integer", "description": "Maximum matches to return (default: 50)"}
+                },
+                "required": ["pattern"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "find_config_files",
+            "description": "Find configuration files (.conf, .yaml, .ini, rc files, etc.) in a directory.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "directory": {"type": "string", "description": "Directory to search (e.g. '/etc/nginx')"},
+                    "max_depth": {"type": "integer", "description": "Maximum depth below the directory (default: 2)"}
+                },
+                "required": ["directory"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": SUBMIT_TOOL_NAME,
+            "description": "Submit the final commands for the task. Call this exactly once, when you have gathered enough information, instead of writing the answer as text.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "commands": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Commands to run, in order"
+                    },
+                    "explanation": {"type": "string", "description": "What these commands do and why"},
+                    "warnings": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Potential issues or required permissions"
+                    },
+                    "requires_confirmation": {"type": "boolean", "description": "Whether the user must confirm before running"},
+                    "parallel_groups": {
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "integer"}},
+                        "description": "Optional groups of 1-based command numbers that may run concurrently"
+                    },
+                    "depends_on": {
+                        "type": "object",
+                        "additionalProperties": {"type": "array", "items": {"type": "integer"}},
+                        "description": "Optional map of command number to the command numbers it must wait for"
+                    }
+                },
+                "required": ["commands", "explanation"]
+            }
+        }
     }
 ]
 
@@ -149,9 +358,28 @@ class CommandExecutor:
     def __init__(self, llm_client: LLMClient):
         self.llm_client = llm_client
         self.max_iterations = 10  # Prevent infinite loops
+        self.policy = ExecutionPolicy(getattr(llm_client, 'execution_limits', None))
+        self.shared_cache = getattr(llm_client, 'shared_cache', None)  # SharedCache or None
+        self.command_idle_timeout = getattr(llm_client, 'command_idle_timeout_seconds', None)
+        self.tools = ToolRegistry(
+            TOOL_DEFINITIONS,
+            enabled=getattr(llm_client, 'tools_enabled', None),
+            disabled=getattr(llm_client, 'tools_disabled', None),
+            selection=getattr(llm_client, 'tool_selection', True)
+        )
+        self.task_memory = None
+        if getattr(llm_client, 'task_memory', False):
+            self.task_memory = TaskMemory(getattr(llm_client, 'task_memory_path', None) or '~/.cache/can-you/task_memory.json')
     
-    def execute_quick_task(self, task_description, auto_confirm=False, dry_run=False):
-        """Execute a single-step task"""
+    def execute_quick_task(self, task_description, auto_confirm=False, dry_run=False, on_commands=None,
+                           session_context=None):
+        """
+        Execute a single-step task.
+        Returns an outcome dict with a 'status' key (see _execute_commands).
+        on_commands, if given, is called with the parsed response before
+        the commands run so callers can persist them. session_context is a
+        summary of earlier tasks in an interactive session.
+        """
         print(f"\n🎯 Task: {task_description}\n")
         
         # Get platform information
@@ -170,58 +398,209 @@ User Task: {task_description}
 IMPORTANT: Generate commands appropriate for the {platform_info.get('platform', 'current')} platform and {platform_info.get('shell', 'shell')}."""
         else:
             context = task_description
+        if session_context:
+            context = f"Earlier in this session (the task may refer to these):\n{session_context}\n\n{context}"
+        
+        # A near-identical earlier task can answer without the LLM, or at least hint
+        reuse, hint, path_state = self._recall(task_description, platform_info or {}, session_context)
+        
+        def finish(result):
+            if on_commands:
+                on_commands(result)
+            outcome = self._execute_commands(result, auto_confirm, dry_run)
+            if self.task_memory and outcome.get("status") == "completed":
+                self.task_memory.record(task_description, platform_info or {}, result, path_state)
+            return outcome
+        
+        if reuse:
+            return finish(reuse)
+        if hint:
+            context = f"{context}\n\n{hint}"
         
         # Start conversation with LLM
         iteration = 0
+        metrics = current_metrics()
+        tracker = ConvergenceTracker(getattr(self.llm_client, 'convergence_stall_rounds', 2))
+        prompt = context
+        # Only the schemas relevant to the task; all of them once the model asks for one left out
+        used = set()
+        expanded = False
+        tools = self.tools.select(task_description)
         while iteration < self.max_iterations:
             iteration += 1
+            if metrics:
+                metrics.record_iteration()
             
             # Get LLM response
             try:
-                response = self.llm_client.chat(
-                    context if iteration == 1 else "Continue with the task.",
-                    tools=TOOL_DEFINITIONS
-                )
+                response = self.llm_client.chat(prompt, tools=tools)
+            except DeadlineExceeded as e:
+                print(f"⏰ {e}")
+                return {"status": "deadline_exceeded", "error": str(e)}
             except Exception as e:
                 print(f"❌ Error communicating with LLM: {e}")
-                return
+                return {"status": "error", "error": str(e)}
             
             message = response.choices[0].message
+            prompt = "Continue with the task."
             
             # Check if LLM wants to use tools
             if hasattr(message, 'tool_calls') and message.tool_calls:
-                self._handle_tool_calls(message.tool_calls)
-                continue
+                result = self._take_submitted_commands(message.tool_calls)
+                if result is None:
+                    called = {tc.function.name for tc in message.tool_calls} & self.tools.names()
+                    missing = called - self.tools.names(tools)
+                    if missing and not expanded:
+                        expanded = True
+                        print(f"🧰 Model asked for {', '.join(sorted(missing))}; offering every tool from now on")
+                    used |= called
+                    self._handle_tool_calls(message.tool_calls, tracker)
+                    if not tracker.forced and tracker.end_round():
+                        # Repeating itself: no new information will come from more tools
+                        tracker.forced = True
+                        print("🔁 No new information in the last rounds; asking for a final answer\n")
+                        prompt = FINAL_ANSWER_PROMPT
+                        tools = [d for d in TOOL_DEFINITIONS if d["function"]["name"] == SUBMIT_TOOL_NAME]
+                    elif not tracker.forced:
+                        tools = self.tools.definitions if expanded else self.tools.select(task_description, used)
+                    continue
+                if result is False:
+                    # Malformed submission; the model was told why and retries
+                    continue
+                self._report_convergence(tracker, iteration)
+                return finish(result)
             
+            self._report_convergence(tracker, iteration)
             # Check if LLM has a final answer
             if message.content:
                 result = self._parse_llm_response(message.content)
                 
                 if result and 'commands' in result:
-                    self._execute_commands(result, auto_confirm, dry_run)
-                    return
+                    return finish(result)
                 else:
                     print(f"💬 {message.content}")
-                    return
+                    return {"status": "no_commands", "message": message.content}
         
+        self._report_convergence(tracker, iteration)
         print("⚠️  Maximum iterations reached. Task may be incomplete.")
+        return {"status": "max_iterations"}
+    
+    def _recall(self, task_description, platform_info, session_context):
+        """
+        Look the task up in task memory. Returns (result to reuse or None,
+        hint for the prompt or None, existence of the task's paths). A match
+        is reused only for the same task template with changed paths and
+        numbers re-bound, and when the task's paths exist (or not) exactly
+        as they did for the earlier task. Similar tasks above
+        task_memory_hint_threshold become a hint, unless their commands
+        delete, overwrite or stop anything.
+        """
+        if not self.task_memory:
+            return None, None, None
+        match = self.task_memory.find(task_description, platform_info)
+        paths = path_params(extract_template(task_description)[1])
+        path_state = None
+        if paths:
+            probed = probe_paths(list(paths.values()))["results"]
+            path_state = {name: probe["exists"] for name, probe in zip(paths, probed)}
+        if match is None or session_context:
+            return None, None, path_state
+        
+        entry = match["entry"]
+        hint_threshold = getattr(self.llm_client, 'task_memory_hint_threshold', 0.6)
+        paths_agree = all(
+            entry["path_state"].get(name, exists) == exists for name, exists in (path_state or {}).items()
+        )
+        if match["reusable"] and paths_agree:
+            print("♻️  Reusing the answer to the same earlier task:")
+            print(f"   \"{entry['task']}\"\n")
+            return match["result"], None, path_state
+        earlier = match["result"].get("commands", [])
+        if match["score"] >= hint_threshold and not any(is_destructive(c) for c in earlier):
+            commands = '\n'.join(f"  {c}" for c in match["result"].get("commands", []))
+            hint = (f"Hint: a similar earlier task \"{entry['task']}\" was completed with these commands "
+                    f"(adapt them only if they fit this task):\n{commands}")
+            return None, hint, path_state
+        return None, None, path_state
+    
+    def _report_convergence(self, tracker, iteration):
+        summary = tracker.report(iteration, self.max_iterations)
+        if summary:
+            print(f"♻️  Convergence: {summary}\n")
+    
+    def _take_submitted_commands(self, tool_calls):
+        """
+        Look for a submit_commands call among the tool calls.
+        Returns the submitted result dict, None if there is no submission,
+        or False if the submission was malformed (an error is sent back).
+        """
+        submit_call = next((tc for tc in tool_calls if tc.function.name == SUBMIT_TOOL_NAME), None)
+        if submit_call is None:
+            return None
+        
+        try:
+            result = json.loads(submit_call.function.arguments or '{}')
+            commands = result.get('commands')
+            if not isinstance(commands, list) or not all(isinstance(c, str) for c in commands):
+                raise ValueError("'commands' must be a list of strings")
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️  Invalid {SUBMIT_TOOL_NAME} call: {e}")
+            others = [tc for tc in tool_calls if tc is not submit_call]
+            if others:
+                self._handle_tool_calls(others)
+            self.llm_client.add_tool_response(
+                submit_call.id,
+                SUBMIT_TOOL_NAME,
+                {"error": f"Invalid arguments: {e}. Call {SUBMIT_TOOL_NAME} again with valid arguments."}
+            )
+            return False
+        
+        # Every tool call needs a response to keep the conversation valid
+        for tool_call in tool_calls:
+            if tool_call is submit_call:
+                response = {"status": "accepted"}
+            else:
+                response = {"skipped": "final answer already submitted"}
+            self.llm_client.add_tool_response(tool_call.id, tool_call.function.name, response)
+        
+        return result
     
-    def _handle_tool_calls(self, tool_calls):
-        """Execute tool calls and add results to conversation"""
+    def _handle_tool_calls(self, tool_calls, tracker=None):
+        """
+        Execute tool calls and add results to conversation. With a tracker,
+        calls identical to earlier ones in the task are answered with a
+        short note instead of running again. Past the task's deadline,
+        remaining calls are answered with an error instead of running.
+        """
+        deadline = getattr(self.llm_client, 'deadline', None)
         for tool_call in tool_calls:
             function_name = tool_call.function.name
             arguments = json.loads(tool_call.function.arguments)
             
+            if deadline is not None and deadline.expired():
+                self.llm_client.add_tool_response(tool_call.id, function_name,
+                                                  {"error": "Deadline exceeded; tool not run"})
+                continue
+            
+            if tracker is not None and function_name in TOOL_FUNCTIONS and tracker.check(function_name, arguments):
+                print(f"♻️  Repeated call skipped: {function_name}({json.dumps(arguments)})")
+                self.llm_client.add_tool_response(tool_call.id, function_name, DUPLICATE_NOTE)
+                continue
+            
             # Rate limiting: small delay between tool calls to avoid overwhelming the API
             delay = getattr(self.llm_client, 'tool_call_delay_seconds', 0.5)
-            time.sleep(delay)
+            time.sleep(budget(deadline, delay, minimum=0))
             
             print(f"🔧 Calling tool: {function_name}({json.dumps(arguments, indent=2)})")
             
             # Execute the tool
-            if function_name in TOOL_FUNCTIONS:
+            if function_name in TOOL_FUNCTIONS and self.tools.is_enabled(function_name):
                 try:
-                    result = TOOL_FUNCTIONS[function_name](**arguments)
+                    started = time.perf_counter()
+                    result = self._call_tool_within(function_name, arguments, deadline)
+                    metrics = current_metrics()
+                    if metrics:
+                        metrics.record_tool(function_name, time.perf_counter() - started)
                     print(f"✅ Tool result received\n")
                     
                     # Add tool result to conversation
@@ -239,7 +618,66 @@ IMPORTANT: Generate commands appropriate for the {platform_info.get('platform',
                         error_result
                     )
             else:
-                print(f"⚠️  Unknown tool: {function_name}")
+                print(f"⚠️  Unknown or disabled tool: {function_name}")
+                self.llm_client.add_tool_response(
+                    tool_call.id,
+                    function_name,
+                    {"error": f"No tool named {function_name} is available"}
+                )
+    
+    def _call_tool_within(self, function_name, arguments, deadline):
+        """
+        Run a tool, giving up on it when the deadline passes. Tools cannot be
+        interrupted, so a late one finishes in a daemon thread and is ignored.
+        """
+        if deadline is None:
+            return self._call_tool(function_name, arguments)
+        outcome = {}
+        
+        def target():
+            try:
+                outcome["result"] = self._call_tool(function_name, arguments)
+            except Exception as e:
+                outcome["error"] = e
+        
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(deadline.remaining())
+        if thread.is_alive():
+            return {"error": f"{function_name} did not finish before the deadline"}
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+    
+    def _call_tool(self, function_name, arguments):
+        """
+        Run a tool. An identical call already running in another thread is
+        waited for and shared rather than run again.
+        """
+        # Relative paths depend on the working directory
+        key = cache_key(function_name, arguments, os.getcwd())
+        result, shared = TOOL_FLIGHTS.do(key, lambda: self._run_tool(function_name, arguments, key))
+        if shared and current_metrics():
+            current_metrics().record_coalesced()
+        return result
+    
+    def _run_tool(self, function_name, arguments, key):
+        """Run a tool, answering from the host-wide shared cache when its policy allows"""
+        policy = TOOL_CACHE_POLICY.get(function_name)
+        if self.shared_cache is None or policy is None:
+            return TOOL_FUNCTIONS[function_name](**arguments)
+        
+        ttl, version_of = policy
+        version = version_of(arguments)
+        cached = self.shared_cache.get('tool', key, version)
+        if cached is not None:
+            if current_metrics():
+                current_metrics().record_cache_hit()
+            return cached
+        result = TOOL_FUNCTIONS[function_name](**arguments)
+        if not (isinstance(result, dict) and 'error' in result):
+            self.shared_cache.put('tool', key, result, version, ttl)
+        return result
     
     def _parse_llm_response(self, content):
         """Parse LLM response for commands"""
@@ -259,7 +697,15 @@ IMPORTANT: Generate commands appropriate for the {platform_info.get('platform',
             return None
     
     def _execute_commands(self, result, auto_confirm, dry_run):
-        """Execute the commands from LLM response"""
+        """
+        Execute the commands from LLM response.
+        Returns {"status": ..., "executions": [...]} where status is one of
+        completed, failed, dry_run, blocked, cancelled or deadline_exceeded,
+        and each execution records command, exit_code, stdout, stderr and
+        duration_seconds. Each command's timeout is capped by what is left
+        of the task's deadline; commands that would start after it are not run.
+        """
+        deadline = getattr(self.llm_client, 'deadline', None)
         commands = result.get('commands', [])
         explanation = result.get('explanation', '')
         warnings = result.get('warnings', [])
@@ -274,58 +720,282 @@ IMPORTANT: Generate commands appropriate for the {platform_info.get('platform',
                 print(f"  - {warning}")
             print()
         
+        dependencies = self._command_dependencies(result, len(commands))
+        
         print("📝 Commands to execute:")
         for i, cmd in enumerate(commands, 1):
             print(f"  {i}. {cmd}")
+            if dependencies and dependencies[i - 1]:
+                after = ', '.join(str(d + 1) for d in sorted(dependencies[i - 1]))
+                print(f"     (after {after})")
+        if dependencies:
+            print("  Independent commands will run in parallel.")
+        # Compiled plan steps are verified afterwards by checks the model wrote
+        checks = result.get('checks') or []
+        if checks:
+            print("🧪 Checks run afterwards:")
+            for check in checks:
+                print(f"  - {check}")
         print()
         
         if dry_run:
             print("🔍 Dry run mode - not executing commands")
-            return
+            return {"status": "dry_run", "executions": []}
         
         # Validate command safety
         for cmd in commands:
             safety_check = validate_command_safety(cmd)
             if not safety_check['safe']:
                 print(f"🛑 Safety check failed: {safety_check['reason']}")
-                return
+                return {"status": "blocked", "error": safety_check['reason'], "executions": []}
         
-        # Ask for confirmation
-        if requires_confirmation and not auto_confirm:
-            response = input("Execute these commands? (y/N): ")
+        # Ask for confirmation (always when there are checks, which run unattended)
+        if (requires_confirmation or checks) and not auto_confirm:
+            asked = time.perf_counter()
+            response = input("Execute these commands and checks? (y/N): " if checks else
+                             "Execute these commands? (y/N): ")
+            if current_metrics():
+                current_metrics().record_user_wait(time.perf_counter() - asked)
             if response.lower() != 'y':
                 print("❌ Cancelled by user")
-                return
+                return {"status": "cancelled", "executions": []}
         
         # Execute commands
         print("\n🚀 Executing commands...\n")
         # Show shell being used for transparency
         pi = get_platform_info()
         print(f"Using shell: {pi.get('shell', 'unknown')} ({pi.get('shell_type', '')}) on {pi.get('platform', 'unknown platform')}\n")
-        for i, cmd in enumerate(commands, 1):
-            print(f"[{i}/{len(commands)}] Running: {cmd}")
+        
+        if dependencies:
+            executions = self._run_parallel(commands, dependencies)
+        else:
+            executions = []
+            for i, cmd in enumerate(commands, 1):
+                execution = {"command": cmd, "exit_code": None, "stdout": "", "stderr": ""}
+                if deadline is not None and deadline.expired():
+                    print(f"[{i}/{len(commands)}] ⏰ Not run: deadline exceeded")
+                    execution["error"] = "deadline"
+                    executions.append(execution)
+                    continue
+                print(f"[{i}/{len(commands)}] Running: {cmd}")
+                started = time.time()
+                timeout = budget(deadline, COMMAND_TIMEOUT_SECONDS)
+                try:
+                    # Build proper shell command based on platform/shell
+                    run_cmd = build_shell_command(cmd)
+                    result = self.policy.run(run_cmd, timeout=timeout, idle_timeout=self.command_idle_timeout)
+                    execution["usage"] = result["usage"]
+                    
+                    if result["stdout"]:
+                        print(result["stdout"])
+                    if result["stderr"]:
+                        print(f"stderr: {result['stderr']}")
+                    execution.update(stdout=result["stdout"], stderr=result["stderr"])
+                    
+                    if result["idle_timed_out"]:
+                        execution["error"] = "idle_timeout"
+                        print(f"⏱️  Command stopped: no output for {self.command_idle_timeout} seconds")
+                    elif result["timed_out"]:
+                        execution["error"] = "timeout"
+                        print(f"⏱️  Command timed out after {timeout:.0f} seconds")
+                    else:
+                        execution["exit_code"] = result["returncode"]
+                        if result["returncode"] != 0:
+                            print(f"⚠️  Command exited with code {result['returncode']}")
+                        else:
+                            print(f"✅ Success")
+                    if result["usage"]:
+                        print(f"📈 {format_usage(result['usage'])}\n")
+                    else:
+                        print()
+                        
+                except Exception as e:
+                    execution["error"] = str(e)
+                    print(f"❌ Error: {e}")
+                execution["duration_seconds"] = round(time.time() - started, 3)
+                executions.append(execution)
+        
+        metrics = current_metrics()
+        if metrics:
+            for execution in executions:
+                if "duration_seconds" in execution:
+                    metrics.record_execution(execution["duration_seconds"])
+        
+        all_ok = all(e["exit_code"] == 0 for e in executions)
+        if all_ok:
+            status = "completed"
+        elif deadline is not None and deadline.expired():
+            status = "deadline_exceeded"
+        else:
+            status = "failed"
+        return {"status": status, "executions": executions}
+
+    def _command_dependencies(self, result, count):
+        """
+        Build a dependency map {index: set(indices it waits for)} from the
+        optional 'parallel_groups' / 'depends_on' fields (1-based indices).
+        Returns None when neither is given, meaning run sequentially. With
+        depends_on alone, commands it does not mention keep their place in
+        the sequence: they wait for every earlier command, and commands
+        without their own entry wait for them.
+        """
+        groups = result.get('parallel_groups')
+        depends_on = result.get('depends_on')
+        if not groups and not depends_on:
+            return None
+        
+        def to_index(n):
             try:
-                # Build proper shell command based on platform/shell
-                run_cmd = build_shell_command(cmd)
-                result = subprocess.run(
-                    run_cmd,
-                    shell=False,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
+                i = int(n) - 1
+            except (TypeError, ValueError):
+                return None
+            return i if 0 <= i < count else None
+        
+        dependencies = {i: set() for i in range(count)}
+        
+        if groups:
+            # Groups run in order; commands within a group run concurrently
+            grouped = set()
+            for group in groups:
+                members = {to_index(n) for n in group} - {None} - grouped
+                for m in members:
+                    dependencies[m] |= grouped
+                grouped |= members
+            # Ungrouped commands keep their sequential order after the groups
+            previous = None
+            for i in range(count):
+                if i not in grouped:
+                    dependencies[i] |= grouped
+                    if previous is not None:
+                        dependencies[i].add(previous)
+                    previous = i
+        
+        if depends_on:
+            for key, values in depends_on.items():
+                i = to_index(key)
+                if i is None:
+                    continue
+                if not isinstance(values, list):
+                    values = [values]
+                dependencies[i] |= {to_index(v) for v in values} - {None, i}
+            if not groups:
+                keys = {to_index(k) for k in depends_on} - {None}
+                mentioned = set(keys)
+                for values in depends_on.values():
+                    mentioned |= {to_index(v) for v in (values if isinstance(values, list) else [values])}
+                unmentioned = []
+                for i in range(count):
+                    if i not in mentioned:
+                        dependencies[i] |= set(range(i))
+                        unmentioned.append(i)
+                    elif i not in keys:
+                        dependencies[i] |= set(unmentioned)
+        
+        return dependencies
+    
+    def _run_parallel(self, commands, dependencies):
+        """Run commands concurrently as their dependencies complete"""
+        max_workers = max(1, int(getattr(self.llm_client, 'max_parallel_commands', 4)))
+        print_lock = threading.Lock()
+        exit_codes = {}  # index -> exit code, or None if timed out / errored / skipped
+        executions = {}
+        pending = set(range(len(commands)))
+        running = {}
+        causes = {}  # skipped index -> index of the command whose failure skipped it
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                # Skip everything downstream of a failure, however deep, before
+                # deciding whether what is left is waiting on a cycle
+                skipped = True
+                while skipped:
+                    skipped = False
+                    for i in sorted(pending):
+                        failed = [d for d in dependencies[i] if d in exit_codes and exit_codes[d] != 0]
+                        if failed:
+                            cause = min(causes.get(d, d) for d in failed)
+                            causes[i] = cause
+                            pending.discard(i)
+                            exit_codes[i] = None
+                            executions[i] = {"command": commands[i], "exit_code": None, "error": "skipped",
+                                             "skipped_because": cause + 1}
+                            with print_lock:
+                                print(f"[{i + 1}] ⏭️  Skipped: command {cause + 1}, which it depends on, did not succeed")
+                            skipped = True
+                for i in sorted(pending):
+                    deps = dependencies[i]
+                    if deps.issubset(exit_codes) and len(running) < max_workers:
+                        pending.discard(i)
+                        with print_lock:
+                            print(f"[{i + 1}] Running: {commands[i]}")
+                        running[pool.submit(self._run_prefixed, i + 1, commands[i], print_lock)] = i
                 
-                if result.stdout:
-                    print(result.stdout)
-                if result.stderr:
-                    print(f"stderr: {result.stderr}")
+                if not running:
+                    # Remaining commands wait on each other (dependency cycle)
+                    for i in sorted(pending):
+                        exit_codes[i] = None
+                        executions[i] = {"command": commands[i], "exit_code": None, "error": "skipped"}
+                        print(f"[{i + 1}] ⏭️  Skipped: circular dependency")
+                    break
                 
-                if result.returncode != 0:
-                    print(f"⚠️  Command exited with code {result.returncode}")
-                else:
-                    print(f"✅ Success\n")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"⏱️  Command timed out after 300 seconds")
-            except Exception as e:
-                print(f"❌ Error: {e}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    executions[i] = future.result()
+                    exit_codes[i] = executions[i]["exit_code"]
+        
+        succeeded = sum(1 for code in exit_codes.values() if code == 0)
+        failed = sum(1 for code in exit_codes.values() if code not in (0, None))
+        skipped = len(commands) - succeeded - failed
+        print(f"\n📊 Results: {succeeded} succeeded, {failed} failed, {skipped} skipped or timed out")
+        for i in sorted(exit_codes):
+            if exit_codes[i] not in (0, None):
+                print(f"  [{i + 1}] exited with code {exit_codes[i]}")
+        return [executions[i] for i in range(len(commands))]
+    
+    def _run_prefixed(self, number, cmd, print_lock, timeout=COMMAND_TIMEOUT_SECONDS):
+        """Run one command, streaming its output with a [number] prefix"""
+        execution = {"command": cmd, "exit_code": None, "stdout": "", "stderr": ""}
+        deadline = getattr(self.llm_client, 'deadline', None)
+        if deadline is not None and deadline.expired():
+            with print_lock:
+                print(f"[{number}] ⏰ Not run: deadline exceeded")
+            execution["error"] = "deadline"
+            return execution
+        timeout = budget(deadline, timeout)
+        started = time.time()
+        
+        def show(line):
+            with print_lock:
+                print(f"[{number}] {line.rstrip()}")
+        
+        try:
+            # stderr is merged into stdout so interleaving is preserved
+            result = self.policy.run(build_shell_command(cmd), timeout=timeout, on_line=show, merge_stderr=True,
+                                     idle_timeout=self.command_idle_timeout)
+        except Exception as e:
+            with print_lock:
+                print(f"[{number}] ❌ Error: {e}")
+            execution["error"] = str(e)
+            return execution
+        
+        execution["stdout"] = result["stdout"]
+        execution["usage"] = result["usage"]
+        execution["duration_seconds"] = round(time.time() - started, 3)
+        with print_lock:
+            if result["idle_timed_out"]:
+                print(f"[{number}] ⏱️  Command stopped: no output for {self.command_idle_timeout} seconds")
+                execution["error"] = "idle_timeout"
+                return execution
+            if result["timed_out"]:
+                print(f"[{number}] ⏱️  Command timed out after {timeout:.0f} seconds")
+                execution["error"] = "timeout"
+                return execution
+            execution["exit_code"] = result["returncode"]
+            if result["returncode"] != 0:
+                print(f"[{number}] ⚠️  Command exited with code {result['returncode']}")
+            else:
+                print(f"[{number}] ✅ Success")
+            if result["usage"]:
+                print(f"[{number}] 📈 {format_usage(result['usage'])}")
+        return execution
@@ -0,0 +1,393 @@
+import itertools
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+IONICE_CLASSES = {'realtime': '1', 'best-effort': '2', 'idle': '3'}
+
+_cgroup_counter = itertools.count(1)
+
+# Controllers the parent cgroup must enable for each setting
+CGROUP_CONTROLLERS = {'cpu_percent': 'cpu', 'memory_max_mb': 'memory', 'io_weight': 'io'}
+
+# Moves the command into its cgroup before exec; $0 is the cgroup path
+CGROUP_JOIN = '{ echo $$ > "$0/cgroup.procs"; } 2>/dev/null; exec "$@"'
+
+# How long a cancelled command gets to exit after SIGTERM before SIGKILL
+TERMINATE_GRACE_SECONDS = 2
+
+
+def _descendants(pid):
+    """PIDs of every process below pid, from /proc"""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields follow the last ')'
+        ppid = int(stat[stat.rfind(')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    found, queue = [], [pid]
+    while queue:
+        for child in children.get(queue.pop(), []):
+            found.append(child)
+            queue.append(child)
+    return found
+
+
+def _running(pid):
+    """Whether pid exists and is not a zombie waiting to be reaped"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+    except OSError:
+        return False
+    return stat[stat.rfind(')') + 2:stat.rfind(')') + 3] != 'Z'
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_usage(usage):
+    """One-line summary of a command's resource usage"""
+    parts = []
+    if 'cpu_seconds' in usage:
+        parts.append(f"cpu {usage['cpu_seconds']:.2f}s")
+    if 'max_rss_bytes' in usage:
+        parts.append(f"max RSS {format_bytes(usage['max_rss_bytes'])}")
+    if 'read_bytes' in usage:
+        parts.append(f"read {format_bytes(usage['read_bytes'])}")
+    if 'write_bytes' in usage:
+        parts.append(f"written {format_bytes(usage['write_bytes'])}")
+    return ', '.join(parts)
+
+
+class ExecutionPolicy:
+    """
+    Runs generated commands under configurable resource limits and reports
+    what they used. Supported settings (all optional, from the
+    `execution_limits` config section):
+
+      nice: 10                      # CPU priority adjustment
+      ionice_class: idle            # realtime, best-effort or idle
+      ionice_level: 7               # 0-7 within best-effort/realtime
+      max_memory_mb: 2048           # RLIMIT_AS
+      max_cpu_seconds: 600          # RLIMIT_CPU
+      cgroup:                       # transient cgroup v2 per command
+        cpu_percent: 50             # cpu.max as a percentage of one CPU
+        memory_max_mb: 1024         # memory.max
+        io_weight: 50               # io.weight (1-10000)
+        parent: /user.slice/...     # delegated cgroup to create it under (required)
+
+    Limits are applied by prefixing the command (nice, prlimit, ionice and
+    a shell that joins the cgroup before exec), never in a preexec_fn,
+    which is unsafe in a threaded process. Without the nice or prlimit
+    binaries the parent sets them right after the command starts.
+
+    The cgroup parent must be delegated to this user and hold no
+    processes itself: cgroup v2 only lets leaf cgroups contain processes,
+    so this process's own cgroup cannot be used. It is checked, and its
+    controllers enabled, when the policy is created.
+
+    Usage (CPU time, max RSS, bytes read/written) comes from wait4(), or
+    from the cgroup's own counters when one is used.
+    """
+
+    def __init__(self, limits=None):
+        limits = limits or {}
+        self.nice = limits.get('nice')
+        self.ionice_class = limits.get('ionice_class')
+        self.ionice_level = limits.get('ionice_level')
+        self.max_memory_mb = limits.get('max_memory_mb')
+        self.max_cpu_seconds = limits.get('max_cpu_seconds')
+        self._cgroup_warned = False
+        self.cgroup = self._check_cgroup(limits.get('cgroup') or None)
+
+    def _check_cgroup(self, cgroup):
+        """The cgroup settings if their parent can hold per-command cgroups, else None"""
+        if not cgroup:
+            return None
+        parent = cgroup.get('parent')
+        if not parent:
+            return self._cgroup_unavailable("execution_limits.cgroup.parent must name a delegated cgroup")
+        path = os.path.join(CGROUP_ROOT, parent.lstrip('/'))
+        if not os.path.isdir(path):
+            return self._cgroup_unavailable(f"{path} does not exist")
+        needed = {CGROUP_CONTROLLERS[key] for key in CGROUP_CONTROLLERS if cgroup.get(key)}
+        try:
+            with open(os.path.join(path, 'cgroup.subtree_control')) as f:
+                enabled = set(f.read().split())
+            missing = needed - enabled
+            if missing:
+                # Fails with EBUSY if the parent holds processes itself
+                self._write(path, 'cgroup.subtree_control', ' '.join(f"+{c}" for c in sorted(missing)))
+        except OSError as e:
+            return self._cgroup_unavailable(f"cannot enable {', '.join(sorted(needed))} in {path}: {e}")
+        return dict(cgroup, path=path)
+
+    def _cgroup_unavailable(self, reason):
+        if not self._cgroup_warned:
+            print(f"⚠️  cgroup limits unavailable ({reason}); using rlimits/nice only")
+            self._cgroup_warned = True
+        return None
+
+    def wrap(self, run_cmd, cgroup_path=None):
+        """Prefix the command with whatever applies the configured limits before it runs"""
+        prefix = []
+        if cgroup_path:
+            prefix += ['/bin/sh', '-c', CGROUP_JOIN, cgroup_path]
+        if self.nice and shutil.which('nice'):
+            prefix += ['nice', '-n', str(int(self.nice))]
+        if (self.max_memory_mb or self.max_cpu_seconds) and shutil.which('prlimit'):
+            prefix.append('prlimit')
+            if self.max_memory_mb:
+                prefix.append(f"--as={int(self.max_memory_mb) * 1024 * 1024}")
+            if self.max_cpu_seconds:
+                prefix.append(f"--cpu={int(self.max_cpu_seconds)}")
+            prefix.append('--')
+        if self.ionice_class and shutil.which('ionice'):
+            prefix += ['ionice', '-c', IONICE_CLASSES.get(self.ionice_class, str(self.ionice_class))]
+            if self.ionice_level is not None and self.ionice_class != 'idle':
+                prefix += ['-n', str(self.ionice_level)]
+        return prefix + list(run_cmd) if prefix else run_cmd
+
+    def _limit_started(self, pid):
+        """Set from the parent the limits wrap() had no binary for"""
+        try:
+            if self.nice and not shutil.which('nice'):
+                os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + int(self.nice))
+            if resource is not None and hasattr(resource, 'prlimit') and not shutil.which('prlimit'):
+                if self.max_memory_mb:
+                    limit = int(self.max_memory_mb) * 1024 * 1024
+                    resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+                if self.max_cpu_seconds:
+                    limit = int(self.max_cpu_seconds)
+                    resource.prlimit(pid, resource.RLIMIT_CPU, (limit, limit))
+        except (OSError, AttributeError):
+            pass  # Already exited, or not supported here
+
+    def _create_cgroup(self):
+        """Create a transient cgroup for one command, or None"""
+        if not self.cgroup:
+            return None
+        path = os.path.join(self.cgroup['path'], f"can-you-{os.getpid()}-{next(_cgroup_counter)}")
+        try:
+            os.mkdir(path)
+            if self.cgroup.get('cpu_percent'):
+                quota = int(float(self.cgroup['cpu_percent']) * 1000)
+                self._write(path, 'cpu.max', f"{quota} 100000")
+            if self.cgroup.get('memory_max_mb'):
+                self._write(path, 'memory.max', str(int(self.cgroup['memory_max_mb']) * 1024 * 1024))
+            if self.cgroup.get('io_weight'):
+                self._write(path, 'io.weight', f"default {int(self.cgroup['io_weight'])}")
+            return path
+        except OSError as e:
+            self._remove_cgroup(path)
+            return self._cgroup_unavailable(e)
+
+    @staticmethod
+    def _write(cgroup_path, name, value):
+        with open(os.path.join(cgroup_path, name), 'w') as f:
+            f.write(value)
+
+    @staticmethod
+    def _remove_cgroup(path):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _cgroup_usage(path):
+        usage = {}
+        try:
+            with open(os.path.join(path, 'cpu.stat')) as f:
+                for line in f:
+                    key, value = line.split()
+                    if key == 'usage_usec':
+                        usage['cpu_seconds'] = int(value) / 1e6
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(os.path.join(path, 'memory.peak')) as f:
+                usage['max_rss_bytes'] = int(f.read().strip())
+        except (OSError, ValueError):
+            pass
+        try:
+            read_bytes = write_bytes = 0
+            with open(os.path.join(path, 'io.stat')) as f:
+                for line in f:
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition('=')
+                        if key == 'rbytes':
+                            read_bytes += int(value)
+                        elif key == 'wbytes':
+                            write_bytes += int(value)
+            usage['read_bytes'] = read_bytes
+            usage['write_bytes'] = write_bytes
+        except (OSError, ValueError):
+            pass
+        return usage
+
+    @staticmethod
+    def _rusage_usage(ru):
+        return {
+            'cpu_seconds': round(ru.ru_utime + ru.ru_stime, 3),
+            'max_rss_bytes': ru.ru_maxrss * 1024,  # ru_maxrss is in KB on Linux
+            'read_bytes': ru.ru_inblock * 512,
+            'write_bytes': ru.ru_oublock * 512,
+        }
+
+    @staticmethod
+    def _terminate(process, cgroup_path):
+        """
+        Stop a command and everything it started: SIGTERM to the whole tree,
+        SIGKILL to whatever is left after a grace period. Commands are not
+        put in their own session or process group, because sudo password
+        prompts and interactive tools need the terminal's foreground group;
+        the tree is found through /proc instead, or killed at once through
+        cgroup.kill when the command runs in its own cgroup.
+        """
+        if cgroup_path:
+            try:
+                with open(os.path.join(cgroup_path, 'cgroup.procs')) as f:
+                    joined = str(process.pid) in f.read().split()
+                if joined:
+                    with open(os.path.join(cgroup_path, 'cgroup.kill'), 'w') as f:
+                        f.write('1')
+                    return
+            except OSError:
+                pass  # Kernels before 5.14
+        if not os.path.isdir('/proc'):
+            process.kill()
+            return
+        pids = [process.pid] + _descendants(process.pid)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        give_up = time.monotonic() + TERMINATE_GRACE_SECONDS
+        while time.monotonic() < give_up:
+            pids = [pid for pid in pids if _running(pid)]
+            if not pids:
+                return
+            time.sleep(0.1)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def run(self, run_cmd, timeout=300, on_line=None, merge_stderr=False, idle_timeout=None):
+        """
+        Run a command under the policy. It is stopped (with everything it
+        started) after `timeout` seconds, or after `idle_timeout` seconds
+        without printing anything.
+        Returns {returncode, stdout, stderr, timed_out, idle_timed_out,
+        usage}; on_line is called with each stdout line as it arrives.
+        """
+        cgroup_path = self._create_cgroup()
+        try:
+            process = subprocess.Popen(
+                self.wrap(run_cmd, cgroup_path),
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+                text=True
+            )
+        except BaseException:
+            if cgroup_path:
+                self._remove_cgroup(cgroup_path)
+            raise
+        self._limit_started(process.pid)
+
+        reaped = threading.Event()
+        timed_out = threading.Event()
+        idle_timed_out = threading.Event()
+        last_output = [time.monotonic()]
+
+        def kill(flag=timed_out):
+            if not reaped.is_set() and not (timed_out.is_set() or idle_timed_out.is_set()):
+                flag.set()
+                self._terminate(process, cgroup_path)
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+
+        stdout, stderr = [], []
+
+        def pump(stream, sink, callback):
+            for line in stream:
+                last_output[0] = time.monotonic()
+                sink.append(line)
+                if callback:
+                    callback(line)
+
+        pumps = [threading.Thread(target=pump, args=(process.stdout, stdout, on_line), daemon=True)]
+        if not merge_stderr:
+            pumps.append(threading.Thread(target=pump, args=(process.stderr, stderr, None), daemon=True))
+        for thread in pumps:
+            thread.start()
+
+        usage = {}
+        try:
+            while any(thread.is_alive() for thread in pumps):
+                for thread in pumps:
+                    thread.join(0.5)
+                if idle_timeout and time.monotonic() - last_output[0] > idle_timeout:
+                    kill(idle_timed_out)
+                if timed_out.is_set() or idle_timed_out.is_set():
+                    # Background children may hold the pipes open after a kill
+                    for thread in pumps:
+                        thread.join(1.0)
+                    break
+            if hasattr(os, 'wait4'):
+                try:
+                    _, status, ru = os.wait4(process.pid, 0)
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    usage = self._rusage_usage(ru)
+                except ChildProcessError:
+                    process.wait()  # Already reaped by Popen.poll()
+            else:
+                process.wait()
+        finally:
+            reaped.set()
+            timer.cancel()
+            if process.returncode is None:
+                process.kill()
+                process.wait()
+            if cgroup_path:
+                usage.update(self._cgroup_usage(cgroup_path))
+                self._remove_cgroup(cgroup_path)
+
+        return {
+            'returncode': process.returncode,
+            'stdout': ''.join(stdout),
+            'stderr': ''.join(stderr),
+            'timed_out': timed_out.is_set(),
+            'idle_timed_out': idle_timed_out.is_set(),
+            'usage': usage
+        }
@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from collections import deque
+
+# litellm exception class names worth retrying (matched by name so this
+# works across litellm versions)
+RETRYABLE_ERRORS = {
+    'RateLimitError',
+    'Timeout',
+    'APITimeoutError',
+    'APIConnectionError',
+    'ServiceUnavailableError',
+    'InternalServerError',
+}
+
+
+def is_retryable(error):
+    """True for transient provider errors (timeouts, 429, 5xx, connection)"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def is_rate_limited(error):
+    return type(error).__name__ == 'RateLimitError'
+
+
+def backoff_delay(attempt, base_seconds=1.0, max_seconds=30.0):
+    """Exponential backoff with full jitter for the given 0-based attempt"""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
+
+
+class RateBudget:
+    """
+    Minimum spacing between request starts, shared by every LLMClient in
+    the process. Normal requests wait their turn; hedges only use the
+    budget when it is free right now, so they never queue up behind
+    (or cause) rate-limit errors.
+    """
+
+    def __init__(self, min_interval_seconds):
+        self.min_interval_seconds = min_interval_seconds
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval_seconds
+        if start > now:
+            time.sleep(start - now)
+
+    def try_acquire(self):
+        """Take a slot only if one is available immediately"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_start:
+                return False
+            self._next_start = now + self.min_interval_seconds
+            return True
+
+    def seconds_until_free(self):
+        with self._lock:
+            return max(0.0, self._next_start - time.monotonic())
+
+    def penalize(self, seconds):
+        """Push the next start back, e.g. after the provider returned 429"""
+        with self._lock:
+            self._next_start = max(self._next_start, time.monotonic() + seconds)
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def get_rate_budget(min_interval_seconds):
+    """Process-wide RateBudget for a given interval"""
+    with _budgets_lock:
+        if min_interval_seconds not in _budgets:
+            _budgets[min_interval_seconds] = RateBudget(min_interval_seconds)
+        return _budgets[min_interval_seconds]
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies"""
+
+    def __init__(self, window=100):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
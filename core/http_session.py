@@ -0,0 +1,86 @@
+import threading
+
+# Default endpoints per litellm provider prefix, used for the warm-up request
+PROVIDER_BASE_URLS = {
+    'openai': 'https://api.openai.com',
+    'anthropic': 'https://api.anthropic.com',
+    'gemini': 'https://generativelanguage.googleapis.com',
+    'deepseek': 'https://api.deepseek.com',
+    'mistral': 'https://api.mistral.ai',
+    'groq': 'https://api.groq.com',
+}
+
+# Providers litellm reaches through the OpenAI SDK, the only path that honours
+# litellm.client_session; others (anthropic, gemini, ...) use their own clients
+OPENAI_COMPATIBLE_PROVIDERS = {
+    'openai', 'azure', 'deepseek', 'mistral', 'groq', 'openrouter', 'together_ai', 'fireworks_ai',
+    'deepinfra', 'perplexity', 'litellm_proxy', 'hosted_vllm',
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session(pool_size=10, keepalive_seconds=60):
+    """
+    Process-wide pooled httpx.Client with keep-alive, so TLS connections to
+    the provider are reused across turns, conversation resets and planner
+    steps. Returns None if httpx is not installed.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            try:
+                import httpx
+            except ImportError:
+                return None
+            _session = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=keepalive_seconds
+                )
+            )
+        return _session
+
+
+def uses_client_session(model):
+    """Whether litellm sends this model's requests through litellm.client_session"""
+    if '/' in model:
+        return model.split('/', 1)[0] in OPENAI_COMPATIBLE_PROVIDERS
+    return model.startswith(('gpt', 'o1', 'o3', 'o4'))
+
+
+def provider_base_url(model, api_base=None):
+    """Best guess at the provider endpoint a model name talks to"""
+    if api_base:
+        return api_base
+    provider = model.split('/', 1)[0] if '/' in model else ''
+    if provider in PROVIDER_BASE_URLS:
+        return PROVIDER_BASE_URLS[provider]
+    if model.startswith('claude'):
+        return PROVIDER_BASE_URLS['anthropic']
+    if model.startswith('gemini'):
+        return PROVIDER_BASE_URLS['gemini']
+    if model.startswith(('gpt', 'o1', 'o3', 'o4')):
+        return PROVIDER_BASE_URLS['openai']
+    return None
+
+
+def warm_up(session, url):
+    """
+    Open a connection to url in the background so DNS, TCP and TLS setup
+    overlap with startup instead of delaying the first LLM call.
+    """
+    if session is None or not url:
+        return None
+
+    def _ping():
+        try:
+            session.head(url, timeout=5)
+        except Exception:
+            pass  # Warm-up is best effort
+
+    thread = threading.Thread(target=_ping, name='http-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -1,38 +1,153 @@
+import os
+# Use litellm's bundled model cost map instead of fetching it at import:
+# faster startup, and no network needed when running against a local model
+os.environ.setdefault('LITELLM_LOCAL_MODEL_COST_MAP', 'True')
 import litellm
 import yaml
-import json
-import os
+import copy
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
+from core.hedging import (
+    LatencyTracker,
+    backoff_delay,
+    get_rate_budget,
+    is_rate_limited,
+    is_retryable,
+)
+from core.http_session import get_http_session, provider_base_url, uses_client_session, warm_up
+from core.metrics import current_metrics
+from core.encoders import encode_tool_result
+from core.messages import Message
+from core.shared_cache import get_shared_cache, cache_key
+from core.deadline import DeadlineExceeded, budget
+from core.singleflight import LLM_FLIGHTS
+
+
+def load_config(config_path='config.yaml'):
+    """The settings from config.yaml (path relative to the project root)"""
+    config_file = Path(__file__).parent.parent / config_path
+    with open(config_file, 'r') as f:
+        return yaml.safe_load(f) or {}
+
 
 class LLMClient:
     def __init__(self, config_path='config.yaml'):
         """Initialize LiteLLM client with configuration"""
-        config_file = Path(__file__).parent.parent / config_path
-        
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
         
         self.model = config.get('model', 'gpt-4o-mini')
         self.temperature = config.get('temperature', 0.2)
         self.max_tokens = config.get('max_tokens', 4096)
         self.rate_limit_seconds = config.get('rate_limit_seconds', 7)
         self.tool_call_delay_seconds = config.get('tool_call_delay_seconds', 0.5)
+        self.file_index_roots = config.get('file_index_roots') or []
+        self.max_parallel_commands = config.get('max_parallel_commands', 4)
+        self.runs_dir = config.get('runs_dir', '~/.cache/can-you/runs')
+        self.command_idle_timeout_seconds = config.get('command_idle_timeout_seconds')
+        self.tool_selection = config.get('tool_selection', True)
+        self.tools_enabled = config.get('tools_enabled')  # None: every tool
+        self.tools_disabled = config.get('tools_disabled', [])
+        self.execution_limits = config.get('execution_limits') or {}
+        self.record_history = config.get('record_history', True)
+        self.history_db = config.get('history_db', '~/.cache/can-you/history.db')
+        self.shared_cache_path = config.get('shared_cache_path', '~/.cache/can-you/shared_cache.db')
+        self.shared_cache_max_mb = config.get('shared_cache_max_mb', 128)
+        self.shared_cache = None
+        if config.get('shared_cache', True):
+            self.shared_cache = get_shared_cache(self.shared_cache_path, self.shared_cache_max_mb)
+        self.cache_completions = config.get('cache_completions', False)
+        self.completion_cache_ttl_seconds = config.get('completion_cache_ttl_seconds', 3600)
+        # Set by --fresh: ask the provider even when a cached answer exists
+        self.fresh = False
+        self.task_memory = config.get('task_memory', False)
+        self.task_memory_path = config.get('task_memory_path', '~/.cache/can-you/task_memory.json')
+        self.task_memory_hint_threshold = config.get('task_memory_hint_threshold', 0.6)
+        self.convergence_stall_rounds = config.get('convergence_stall_rounds', 2)
+        self.plan_cache = config.get('plan_cache', True)
+        self.plan_cache_path = config.get('plan_cache_path', '~/.cache/can-you/plan_cache.json')
+        self.plan_cache_ttl_days = config.get('plan_cache_ttl_days', 30)
+        self.plan_cache_max_entries = config.get('plan_cache_max_entries', 200)
+        self.plan_cache_commands = config.get('plan_cache_commands', False)
+        self.compile_plans = config.get('compile_plans', False)
+        self.server_host = config.get('server_host', '127.0.0.1')
+        self.server_port = config.get('server_port', 8765)
+        self.server_workers = config.get('server_workers', 4)
+        self.server_tenants = config.get('server_tenants') or {}
+        self.server_allow_execute = config.get('server_allow_execute', False)
+        self.server_token = config.get('server_token')
+        self.interactive_context_tasks = config.get('interactive_context_tasks', 5)
+        self.interactive_history_file = config.get('interactive_history_file', '~/.cache/can-you/repl_history')
+        
+        # Timeouts, retries and hedging
+        self.request_timeout_seconds = config.get('request_timeout_seconds', 60)
+        self.max_retries = config.get('max_retries', 3)
+        self.retry_backoff_seconds = config.get('retry_backoff_seconds', 1.0)
+        self.hedge_enabled = config.get('hedge_enabled', False)
+        self.hedge_percentile = config.get('hedge_percentile', 95)
+        self.hedge_min_samples = config.get('hedge_min_samples', 5)
+        self.hedge_model = config.get('hedge_model')  # None: duplicate to the same model
+        self.rate_budget = get_rate_budget(self.rate_limit_seconds)
+        self.latency = LatencyTracker()
+        
+        # Local CPU model (llama.cpp or any OpenAI-compatible server) and routing:
+        #   remote - every turn goes to `model` (default)
+        #   hybrid - tool-gathering turns go local, final answers and plans remote
+        #   local  - everything local; no network needed
+        self.local_model = config.get('local_model') or {}
+        self.model_routing = config.get('model_routing', 'remote')
+        if self.model_routing != 'remote' and not self.local_model.get('model'):
+            raise ValueError(f"model_routing '{self.model_routing}' needs local_model.model in config")
+        self._local_failed = False
         
         # Set API key from config or environment
         api_key = config.get('api_key')
         if api_key and api_key != 'YOUR_API_KEY_HERE':
             litellm.api_key = api_key
         
+        # Pooled keep-alive HTTP session shared by every litellm call. Only
+        # OpenAI-compatible providers go through it; litellm's own clients for
+        # the others already keep their connections alive.
+        self.api_base = config.get('api_base')
+        self.http_session = None
+        if uses_client_session(self.model):
+            self.http_session = get_http_session(
+                config.get('http_pool_size', 10),
+                config.get('http_keepalive_seconds', 60)
+            )
+        if self.http_session is not None:
+            litellm.client_session = self.http_session
+        if config.get('http_warmup', True) and self.model_routing != 'local':
+            warm_up(self.http_session, provider_base_url(self.model, self.api_base))
+        
         # Load system prompt
         prompt_file = Path(__file__).parent.parent / 'prompts' / 'system_prompt.txt'
         with open(prompt_file, 'r') as f:
             self.system_prompt = f.read()
         
         self.conversation_history = []
+        self.scheduler = None  # FairScheduler when serving several tenants
+        self.tenant = None
+        self.deadline = None  # Deadline for the current task (--deadline)
+    
+    def fork(self, scheduler=None, tenant=None):
+        """
+        A client sharing this one's configuration, HTTP session, rate budget
+        and latency history, with its own conversation
+        """
+        client = copy.copy(self)
+        client.conversation_history = []
+        client.scheduler = scheduler
+        client.tenant = tenant
+        return client
     
     def chat(self, user_message, tools=None, use_planning_mode=False):
-        """Send message to LLM with optional tool definitions"""
+        """
+        Send message to LLM with optional tool definitions. With hybrid
+        routing, turns that may gather information go to the local model
+        first; if it answers with final commands instead, the same turn is
+        escalated to the remote model.
+        """
         if use_planning_mode:
             # Load planning prompt
             prompt_file = Path(__file__).parent.parent / 'prompts' / 'planner_prompt.txt'
@@ -43,50 +158,258 @@ class LLMClient:
         
         messages = [
             {"role": "system", "content": system_prompt},
-            *self.conversation_history,
+            *(message.to_dict() for message in self.conversation_history),
             {"role": "user", "content": user_message}
         ]
         
         try:
-            # Rate limiting: wait before API request to avoid rate limiting
-            time.sleep(self.rate_limit_seconds)
-            
+            if self.deadline is not None:
+                self.deadline.check("an LLM request")
             kwargs = {
                 "model": self.model,
                 "messages": messages,
                 "temperature": self.temperature,
-                "max_tokens": self.max_tokens
+                "max_tokens": self.max_tokens,
+                "timeout": budget(self.deadline, self.request_timeout_seconds)
             }
             
+            if self.api_base:
+                kwargs["api_base"] = self.api_base
+            
             if tools:
                 kwargs["tools"] = tools
                 kwargs["tool_choice"] = "auto"
             
-            response = litellm.completion(**kwargs)
+            # Identical requests already in flight in this process (batch jobs,
+            # API tenants) share that call instead of paying for their own
+            try:
+                response, shared = LLM_FLIGHTS.do(
+                    self._request_key(kwargs),
+                    lambda: self._fetch_completion(kwargs, tools, use_planning_mode),
+                    timeout=self.deadline.remaining() if self.deadline is not None else None
+                )
+            except TimeoutError:
+                if self.deadline is not None and self.deadline.expired():
+                    raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s exceeded during an LLM request")
+                raise
+            if shared and current_metrics():
+                current_metrics().record_coalesced()
             
             # Store in conversation history
-            self.conversation_history.append({"role": "user", "content": user_message})
+            self.conversation_history.append(Message("user", user_message))
             
             assistant_message = response.choices[0].message
-            self.conversation_history.append({
-                "role": "assistant", 
-                "content": assistant_message.content or "",
-                "tool_calls": assistant_message.tool_calls if hasattr(assistant_message, 'tool_calls') else None
-            })
+            self.conversation_history.append(Message(
+                "assistant",
+                assistant_message.content or "",
+                tool_calls=getattr(assistant_message, 'tool_calls', None)
+            ))
             
             return response
         
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"LiteLLM error: {str(e)}")
     
+    def _fetch_completion(self, kwargs, tools, use_planning_mode):
+        """One turn from the shared cache, the local model or the provider"""
+        # An identical request answered by any process on this host
+        key = self._completion_cache_key(kwargs)
+        response = self._cached_completion(key)
+        if response is None:
+            if self._route(tools, use_planning_mode) == 'local':
+                response = self._local_turn(kwargs)
+            if response is None:
+                started = time.perf_counter()
+                response = self._completion_with_retries(kwargs)
+                metrics = current_metrics()
+                if metrics:
+                    metrics.record_llm_call(time.perf_counter() - started, response, self.model)
+            self._store_completion(key, response)
+        return response
+    
+    def _request_key(self, kwargs):
+        return cache_key(
+            kwargs["model"], kwargs["messages"], kwargs.get("tools"),
+            kwargs["temperature"], kwargs["max_tokens"], self.model_routing
+        )
+    
+    def _completion_cache_key(self, kwargs):
+        # Sampled answers vary by design; only deterministic requests are shared
+        if self.shared_cache is None or not self.cache_completions or kwargs["temperature"] > 0:
+            return None
+        return self._request_key(kwargs)
+    
+    def _cached_completion(self, key):
+        if key is None or self.fresh:
+            return None
+        data = self.shared_cache.get('completion', key)
+        if data is None:
+            return None
+        try:
+            response = litellm.ModelResponse(**data)
+        except Exception:
+            return None
+        metrics = current_metrics()
+        if metrics:
+            metrics.record_cache_hit()
+        return response
+    
+    def _store_completion(self, key, response):
+        if key is None:
+            return
+        try:
+            data = response.model_dump()
+        except Exception:
+            return  # Not a litellm response object; nothing to share
+        self.shared_cache.put('completion', key, data, ttl_seconds=self.completion_cache_ttl_seconds)
+    
+    def _route(self, tools, use_planning_mode):
+        """'local' or 'remote' for this turn under the routing policy"""
+        if self.model_routing == 'local':
+            return 'local'
+        if self.model_routing != 'hybrid' or self._local_failed or use_planning_mode:
+            return 'remote'
+        # A turn offering only the submit tool is command synthesis
+        return 'local' if tools and len(tools) > 1 else 'remote'
+    
+    def _local_kwargs(self, kwargs):
+        local = dict(
+            kwargs,
+            model=self.local_model['model'],
+            api_base=self.local_model.get('api_base', 'http://127.0.0.1:8080/v1'),
+            api_key=self.local_model.get('api_key', 'sk-no-key-required'),
+            timeout=budget(self.deadline, self.local_model.get('timeout_seconds', self.request_timeout_seconds))
+        )
+        if self.local_model.get('max_tokens'):
+            local['max_tokens'] = self.local_model['max_tokens']
+        return local
+    
+    @staticmethod
+    def _is_final_answer(response):
+        """True if the model answered (submitted or wrote commands) rather than calling tools"""
+        message = response.choices[0].message
+        tool_calls = getattr(message, 'tool_calls', None)
+        if tool_calls:
+            return any(tc.function.name == 'submit_commands' for tc in tool_calls)
+        return True
+    
+    def _local_turn(self, kwargs):
+        """
+        Run a turn on the local model. Returns None when the remote model
+        should take the turn instead: hybrid routing and the local model
+        produced a final answer, or the local server failed.
+        """
+        offline = self.model_routing == 'local'
+        local_kwargs = self._local_kwargs(kwargs)
+        started = time.perf_counter()
+        try:
+            response = litellm.completion(**local_kwargs)
+        except Exception as e:
+            if offline:
+                raise
+            # Don't keep paying for a dead local server this run
+            self._local_failed = True
+            print(f"⚠️  Local model unavailable ({type(e).__name__}); using {self.model} for all turns")
+            return None
+        # Local turns show up under the local model's name in the latency stats
+        metrics = current_metrics()
+        if metrics:
+            metrics.record_llm_call(time.perf_counter() - started, response, local_kwargs['model'])
+        if not offline and self._is_final_answer(response):
+            if metrics:
+                metrics.record_escalation()
+            return None
+        return response
+    
+    def _completion_with_retries(self, kwargs):
+        """Call the provider with jittered exponential retries on transient errors"""
+        attempt = 0
+        while True:
+            # Rate limiting: requests start at least rate_limit_seconds apart,
+            # in fair order across tenants when serving the HTTP API
+            if self.scheduler is not None:
+                self.scheduler.acquire(self.tenant)
+            else:
+                self.rate_budget.acquire()
+            if self.deadline is not None:
+                # Waiting for a slot and earlier attempts used part of the budget
+                self.deadline.check("an LLM request")
+                kwargs = dict(kwargs, timeout=self.deadline.timeout(self.request_timeout_seconds))
+            try:
+                return self._hedged_completion(kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, self.retry_backoff_seconds)
+                if self.deadline is not None and delay >= self.deadline.remaining():
+                    raise DeadlineExceeded(f"Deadline of {self.deadline.seconds:g}s leaves no time to retry ({e})")
+                if is_rate_limited(e):
+                    # Slow every client down, and keep hedges off meanwhile
+                    self.rate_budget.penalize(delay + self.rate_limit_seconds)
+                print(f"⏳ LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+    
+    def _hedged_completion(self, kwargs):
+        """
+        Send the request; if it has not returned by the configured percentile
+        of recent latency, send a duplicate (to hedge_model if set) and use
+        whichever finishes first. The slower call is abandoned: litellm calls
+        cannot be interrupted, so it ends on its own request timeout.
+        """
+        hedge_after = None
+        if self.hedge_enabled and len(self.latency) >= self.hedge_min_samples:
+            hedge_after = self.latency.percentile(self.hedge_percentile)
+        
+        started = time.monotonic()
+        if hedge_after is None:
+            response = litellm.completion(**kwargs)
+            self.latency.record(time.monotonic() - started)
+            return response
+        
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary = pool.submit(litellm.completion, **kwargs)
+            done, _ = wait([primary], timeout=hedge_after)
+            # Hedge only once the shared rate budget has a free slot
+            while not done and not self.rate_budget.try_acquire():
+                done, _ = wait([primary], timeout=max(0.05, self.rate_budget.seconds_until_free()))
+            if done:
+                response = primary.result()
+                self.latency.record(time.monotonic() - started)
+                return response
+            
+            metrics = current_metrics()
+            if metrics:
+                metrics.record_hedge()
+            hedge_kwargs = dict(kwargs, model=self.hedge_model or kwargs["model"])
+            hedge = pool.submit(litellm.completion, **hedge_kwargs)
+            
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge and metrics:
+                            metrics.record_hedge(won=True)
+                        self.latency.record(time.monotonic() - started)
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
     def add_tool_response(self, tool_call_id, function_name, result):
         """Add tool execution result to conversation"""
-        self.conversation_history.append({
-            "role": "tool",
-            "tool_call_id": tool_call_id,
-            "name": function_name,
-            "content": json.dumps(result)
-        })
+        self.conversation_history.append(Message(
+            "tool",
+            encode_tool_result(function_name, result),
+            tool_call_id=tool_call_id,
+            name=function_name
+        ))
     
     def reset_conversation(self):
         """Clear conversation history"""
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import weakref
+
+# Contents at least this long are interned in the blob store
+BLOB_MIN_CHARS = 1024
+
+
+class BlobStore:
+    """
+    Process-wide, content-addressed store for large message contents.
+    Identical payloads (the same man page, the same /etc tree) are kept
+    once no matter how many conversations hold them, and dropped when the
+    last message referencing them goes away.
+    """
+
+    def __init__(self):
+        self._blobs = {}  # digest -> [text, refcount]
+        self._lock = threading.Lock()
+
+    def intern(self, text):
+        """Store text (or add a reference to the existing copy); returns its digest"""
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                self._blobs[digest] = [text, 1]
+            else:
+                blob[1] += 1
+        return digest
+
+    def get(self, digest):
+        return self._blobs[digest][0]
+
+    def release(self, digest):
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return
+            blob[1] -= 1
+            if blob[1] <= 0:
+                del self._blobs[digest]
+
+    def stats(self):
+        """{blobs, bytes, references} currently held"""
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "bytes": sum(len(text) for text, _ in self._blobs.values()),
+                "references": sum(refs for _, refs in self._blobs.values()),
+            }
+
+
+BLOB_STORE = BlobStore()
+
+
+class ToolCall:
+    """A tool call requested by the model, reduced to what the API needs back"""
+    __slots__ = ('id', 'name', 'arguments')
+
+    def __init__(self, id, name, arguments):
+        self.id = id
+        self.name = name
+        self.arguments = arguments
+
+    @classmethod
+    def from_response(cls, tool_call):
+        """Copy the fields out of a litellm tool call object or dict"""
+        if isinstance(tool_call, dict):
+            function = tool_call.get('function') or {}
+            return cls(tool_call.get('id'), function.get('name'), function.get('arguments'))
+        function = tool_call.function
+        return cls(tool_call.id, function.name, function.arguments)
+
+    def to_dict(self):
+        return {"id": self.id, "type": "function", "function": {"name": self.name, "arguments": self.arguments}}
+
+
+class Message:
+    """
+    One conversation message. Large contents live in BLOB_STORE and are
+    materialized only when the request is built. The reference is dropped
+    by a weakref.finalize bound to the store, not __del__, so collection
+    during interpreter shutdown never touches half-torn-down globals.
+    """
+    __slots__ = ('role', '_text', '_digest', 'tool_calls', 'tool_call_id', 'name', '__weakref__')
+
+    def __init__(self, role, content, tool_calls=None, tool_call_id=None, name=None):
+        self.role = role
+        self._text = None
+        self._digest = None
+        if content is not None and len(content) >= BLOB_MIN_CHARS:
+            self._digest = BLOB_STORE.intern(content)
+            # Nothing to release once the process is exiting
+            weakref.finalize(self, BLOB_STORE.release, self._digest).atexit = False
+        else:
+            self._text = content
+        self.tool_calls = tuple(ToolCall.from_response(tc) for tc in tool_calls) if tool_calls else None
+        self.tool_call_id = tool_call_id
+        self.name = name
+
+    @property
+    def content(self):
+        if self._digest is not None:
+            return BLOB_STORE.get(self._digest)
+        return self._text
+
+    def to_dict(self):
+        """The message as the completion API expects it"""
+        message = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [tc.to_dict() for tc in self.tool_calls]
+        if self.tool_call_id is not None:
+            message["tool_call_id"] = self.tool_call_id
+        if self.name is not None:
+            message["name"] = self.name
+        return message
@@ -0,0 +1,325 @@
+import math
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_HISTORY_DB = '~/.cache/can-you/history.db'
+
+# Process start, used to measure startup time up to the first LLM call
+PROCESS_START = time.perf_counter()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    mode TEXT NOT NULL,
+    model TEXT,
+    status TEXT,
+    total_seconds REAL,
+    startup_seconds REAL,
+    llm_seconds REAL,
+    tool_seconds REAL,
+    execution_seconds REAL,
+    llm_calls INTEGER,
+    iterations INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER,
+    cache_hits INTEGER,
+    tool_tokens_raw INTEGER,
+    tool_tokens_sent INTEGER,
+    coalesced_calls INTEGER,
+    hedges_fired INTEGER,
+    hedges_won INTEGER,
+    escalations INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_run ON events(run_id);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started_at);
+"""
+
+
+# Columns added after the first release, migrated into older databases
+ADDED_COLUMNS = {
+    'tool_tokens_raw': 'INTEGER',
+    'tool_tokens_sent': 'INTEGER',
+    'coalesced_calls': 'INTEGER',
+    'hedges_fired': 'INTEGER',
+    'hedges_won': 'INTEGER',
+    'escalations': 'INTEGER',
+}
+
+
+def _connect(db_path):
+    path = Path(os.path.expanduser(db_path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+    for column, column_type in ADDED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+    return conn
+
+
+class RunMetrics:
+    """Timings, token counts and cache hits for one invocation"""
+
+    def __init__(self, mode, model=None, since=None):
+        self.mode = mode
+        self.model = model
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._origin = PROCESS_START if since is None else since
+        self.startup_seconds = None
+        self.iterations = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cache_hits = 0
+        self.tool_tokens_raw = 0
+        self.tool_tokens_sent = 0
+        self.coalesced_calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.escalations = 0
+        self.events = []  # (kind, name, seconds)
+
+    def record_llm_call(self, seconds, response=None, model=None):
+        if self.startup_seconds is None:
+            # Everything before the first request (minus the request itself)
+            self.startup_seconds = max(0.0, time.perf_counter() - self._origin - seconds)
+        self.events.append(("llm", model or self.model, seconds))
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+            details = getattr(usage, 'prompt_tokens_details', None)
+            self.cached_tokens += getattr(details, 'cached_tokens', 0) or 0
+        hidden = getattr(response, '_hidden_params', None) or {}
+        if isinstance(hidden, dict) and hidden.get('cache_hit'):
+            self.cache_hits += 1
+
+    def record_cache_hit(self):
+        self.cache_hits += 1
+
+    def record_coalesced(self):
+        """An LLM or tool call answered by an identical call already in flight"""
+        self.coalesced_calls += 1
+
+    def record_hedge(self, won=False):
+        """A duplicate request sent for a slow one; won if it answered first"""
+        if won:
+            self.hedges_won += 1
+        else:
+            self.hedges_fired += 1
+
+    def record_escalation(self):
+        """A local-model turn handed to the remote model (hybrid routing)"""
+        self.escalations += 1
+
+    def record_tool_encoding(self, raw_tokens, sent_tokens):
+        """Estimated tokens of a tool result as plain JSON vs. as encoded"""
+        self.tool_tokens_raw += raw_tokens
+        self.tool_tokens_sent += sent_tokens
+
+    def record_tool(self, name, seconds):
+        self.events.append(("tool", name, seconds))
+
+    def record_execution(self, seconds):
+        self.events.append(("exec", None, seconds))
+
+    def record_iteration(self):
+        self.iterations += 1
+
+    def record_user_wait(self, seconds):
+        """Time spent at confirmation prompts, excluded from total_seconds"""
+        self.events.append(("wait", None, seconds))
+
+    def _total(self, kind):
+        return sum(seconds for k, _, seconds in self.events if k == kind)
+
+    def save(self, status, db_path=DEFAULT_HISTORY_DB):
+        """Append this run to the history database"""
+        conn = _connect(db_path)
+        try:
+            with conn:
+                cursor = conn.execute(
+                    """INSERT INTO runs (started_at, mode, model, status, total_seconds, startup_seconds,
+                           llm_seconds, tool_seconds, execution_seconds, llm_calls, iterations,
+                           prompt_tokens, completion_tokens, cached_tokens, cache_hits,
+                           tool_tokens_raw, tool_tokens_sent, coalesced_calls, hedges_fired, hedges_won,
+                           escalations)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        self.started_at, self.mode, self.model, status,
+                        time.perf_counter() - self._started - self._total("wait"), self.startup_seconds,
+                        self._total("llm"), self._total("tool"), self._total("exec"),
+                        sum(1 for k, _, _ in self.events if k == "llm"), self.iterations,
+                        self.prompt_tokens, self.completion_tokens, self.cached_tokens, self.cache_hits,
+                        self.tool_tokens_raw, self.tool_tokens_sent, self.coalesced_calls,
+                        self.hedges_fired, self.hedges_won, self.escalations
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO events (run_id, kind, name, seconds) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, kind, name, seconds) for kind, name, seconds in self.events]
+                )
+        finally:
+            conn.close()
+
+
+_current = None
+
+
+def start_run_metrics(mode, model=None, since=None):
+    """
+    Begin collecting metrics for this invocation. Startup time is measured
+    from `since` (a perf_counter value), or from process start.
+    """
+    global _current
+    _current = RunMetrics(mode, model, since)
+    return _current
+
+
+def current_metrics():
+    """The active RunMetrics, or None when history is disabled"""
+    return _current
+
+
+def finish_run_metrics(status, db_path=DEFAULT_HISTORY_DB):
+    """Save and clear the active RunMetrics"""
+    global _current
+    metrics, _current = _current, None
+    if metrics is not None:
+        try:
+            metrics.save(status, db_path)
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not save run history: {e}")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _row(label, values):
+    p50, p95, p99 = (percentile(values, p) for p in (50, 95, 99))
+    return f"  {label:<40} {len(values):>6} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}"
+
+
+def _header(title):
+    return f"\n{title}\n  {'':<40} {'count':>6} {'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9}"
+
+
+def print_stats(db_path=DEFAULT_HISTORY_DB, days=30, recent=20, threshold=1.25):
+    """
+    Print p50/p95/p99 latency by mode, model and tool for the last `days`,
+    and flag (mode, model) pairs whose median over the most recent `recent`
+    runs is more than `threshold` times their earlier baseline.
+    """
+    if not Path(os.path.expanduser(db_path)).exists():
+        print("No run history recorded yet.")
+        return
+
+    since = time.time() - days * 86400
+    conn = _connect(db_path)
+    try:
+        runs = conn.execute(
+            """SELECT id, mode, model, total_seconds, llm_calls, iterations, prompt_tokens,
+                      completion_tokens, cache_hits, tool_tokens_raw, tool_tokens_sent, coalesced_calls,
+                      hedges_fired, hedges_won, escalations
+               FROM runs WHERE started_at >= ? ORDER BY started_at""",
+            (since,)
+        ).fetchall()
+        events = conn.execute(
+            """SELECT e.kind, e.name, e.seconds FROM events e JOIN runs r ON r.id = e.run_id
+               WHERE r.started_at >= ?""",
+            (since,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    if not runs:
+        print(f"No runs recorded in the last {days} days.")
+        return
+
+    print(f"📊 {len(runs)} runs in the last {days} days")
+
+    by_mode_model = {}
+    for _, mode, model, total, *_ in runs:
+        by_mode_model.setdefault((mode, model or 'unknown'), []).append(total)
+
+    print(_header("Total run time by mode and model"))
+    for (mode, model), values in sorted(by_mode_model.items()):
+        print(_row(f"{mode} / {model}", values))
+
+    llm_by_model = {}
+    tools = {}
+    execution = []
+    for kind, name, seconds in events:
+        if kind == "llm":
+            llm_by_model.setdefault(name or 'unknown', []).append(seconds)
+        elif kind == "tool":
+            tools.setdefault(name, []).append(seconds)
+        elif kind == "exec":
+            execution.append(seconds)
+
+    if llm_by_model:
+        print(_header("LLM turn latency by model"))
+        for model, values in sorted(llm_by_model.items()):
+            print(_row(model, values))
+    if tools:
+        print(_header("Tool latency"))
+        for name, values in sorted(tools.items()):
+            print(_row(name, values))
+    if execution:
+        print(_header("Command execution"))
+        print(_row("all commands", execution))
+
+    llm_calls = sum(r[4] or 0 for r in runs)
+    print("\nPer run averages:")
+    print(f"  LLM calls:   {llm_calls / len(runs):.1f}")
+    print(f"  Iterations:  {sum(r[5] or 0 for r in runs) / len(runs):.1f}")
+    print(f"  Tokens:      {sum(r[6] or 0 for r in runs) / len(runs):.0f} prompt, "
+          f"{sum(r[7] or 0 for r in runs) / len(runs):.0f} completion")
+    print(f"  Cache hits:  {sum(r[8] or 0 for r in runs)} total")
+    coalesced = sum(r[11] or 0 for r in runs)
+    if coalesced:
+        print(f"  Coalesced:   {coalesced} calls shared an identical in-flight call")
+    hedges = sum(r[12] or 0 for r in runs)
+    if hedges:
+        print(f"  Hedged:      {hedges} slow requests duplicated, {sum(r[13] or 0 for r in runs)} answered first by the duplicate")
+    escalations = sum(r[14] or 0 for r in runs)
+    if escalations:
+        print(f"  Escalated:   {escalations} local-model turns handed to the remote model")
+    raw = sum(r[9] or 0 for r in runs)
+    sent = sum(r[10] or 0 for r in runs)
+    if raw:
+        print(f"  Tool result tokens (est.): {raw} as JSON -> {sent} encoded ({(1 - sent / raw) * 100:.0f}% saved)")
+
+    regressions = []
+    for (mode, model), values in sorted(by_mode_model.items()):
+        if len(values) < recent * 2:
+            continue
+        baseline = percentile(values[:-recent], 50)
+        latest = percentile(values[-recent:], 50)
+        if baseline and latest > baseline * threshold:
+            regressions.append((mode, model, baseline, latest))
+
+    if regressions:
+        print("\n⚠️  Regressions (median of recent runs vs. earlier baseline):")
+        for mode, model, baseline, latest in regressions:
+            print(f"  {mode} / {model}: {baseline:.2f}s -> {latest:.2f}s (+{(latest / baseline - 1) * 100:.0f}%)")
+    else:
+        print("\n✅ No regressions against the rolling baseline")
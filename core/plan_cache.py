@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_PLAN_CACHE_PATH = '~/.cache/can-you/plan_cache.json'
+
+# Parameter kinds, tried in order; each match (or its `value` group) becomes a placeholder
+PARAMETER_PATTERNS = [
+    ('url', re.compile(r'\b[a-z][a-z0-9+.-]*://[^\s\'"]+', re.IGNORECASE)),
+    ('quoted', re.compile(r'"[^"]+"|\'[^\']+\'')),
+    ('email', re.compile(r'\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b')),
+    ('ip', re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?\b')),
+    ('path', re.compile(r'(?<![\w/])(?:~|\.{1,2})?/[^\s\'",;]*|\b[\w.-]+/[\w./-]+')),
+    ('host', re.compile(r'\b(?:[a-z0-9-]+\.)+(?:com|org|net|io|dev|app|local|internal|lan|co|uk|de|fr|eu|cloud|ai)\b', re.IGNORECASE)),
+    ('name', re.compile(
+        r'\b(?:service|user|group|database|container|site|domain|named|called|package|branch|repo|volume|network) '
+        r'(?P<value>[\w@.:-]+)',
+        re.IGNORECASE)),
+    ('number', re.compile(r'\b\d+\b')),
+]
+
+# Words after "service", "site", ... that are not names ("site for example.com")
+NAME_STOP_WORDS = {'a', 'an', 'the', 'for', 'to', 'in', 'on', 'at', 'of', 'with', 'from', 'and', 'or', 'that', 'which'}
+
+PLACEHOLDER = re.compile(r'\{(\w+?)(\d+)\}')
+# Parameter slots inside cached plans (not a sequence plan text would contain)
+MARKER = '⟦{}⟧'
+
+
+def extract_template(task):
+    """
+    Split a task into a normalized template and its parameters, e.g.
+    "Set up nginx site for example.com on port 8080" ->
+    ("set up nginx site for {host1} on port {number1}", {"host1": "example.com", "number1": "8080"})
+    """
+    params = {}
+    counters = {}
+    text = ' '.join(task.split())
+
+    for kind, pattern in PARAMETER_PATTERNS:
+        def substitute(match):
+            group = 'value' if 'value' in match.re.groupindex else 0
+            start = match.start(group)
+            value = match.group(group).rstrip('.')
+            if not value or (kind == 'name' and value.lower() in NAME_STOP_WORDS):
+                return match.group(0)
+            name = next((k for k, v in params.items() if v == value), None)
+            if name is None:
+                counters[kind] = counters.get(kind, 0) + 1
+                name = f"{kind}{counters[kind]}"
+                params[name] = value
+            whole = match.group(0)
+            offset = match.start(0)
+            return whole[:start - offset] + '{' + name + '}' + whole[start - offset + len(value):]
+
+        # Already-extracted placeholders must not be matched again
+        parts = re.split(r'(\{\w+\})', text)
+        text = ''.join(part if PLACEHOLDER.fullmatch(part) else pattern.sub(substitute, part) for part in parts)
+
+    return text.lower().rstrip(' .!?'), params
+
+
+def platform_fingerprint(platform_info):
+    """The parts of the platform a plan depends on"""
+    return '|'.join(str(platform_info.get(key, '')) for key in ('platform', 'distro_id', 'architecture', 'shell'))
+
+
+def _value_pattern(value):
+    # Not part of a longer word, number or path component on either side
+    return re.compile(r'(?<![\w.-])' + re.escape(value) + r'(?![\w-])')
+
+
+def templatize(obj, params):
+    """Replace parameter values inside a plan with markers"""
+    text = json.dumps(obj)
+    # Longest values first so "/var/log/nginx" wins over "/var/log"
+    for name, value in sorted(params.items(), key=lambda item: -len(item[1])):
+        escaped = json.dumps(value)[1:-1]
+        text = _value_pattern(escaped).sub(lambda _: MARKER.format(name), text)
+    return json.loads(text)
+
+
+def instantiate(obj, params):
+    """Fill the markers left by templatize with new parameter values"""
+    text = json.dumps(obj, ensure_ascii=False)
+    for name, value in params.items():
+        text = text.replace(MARKER.format(name), json.dumps(value)[1:-1])
+    return json.loads(text)
+
+
+class PlanCache:
+    """
+    Successful long-mode plans keyed by task template and platform
+    fingerprint. A new task that normalizes to the same template reuses
+    the plan with its own parameters filled in, skipping the planning
+    request. Entries expire after `ttl_days` and the least recently used
+    are evicted beyond `max_entries`. With `cache_commands`, each step's
+    generated commands are stored too and reused the same way.
+    """
+
+    def __init__(self, path=DEFAULT_PLAN_CACHE_PATH, ttl_days=30, max_entries=200, cache_commands=False):
+        self.path = os.path.expanduser(path)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.cache_commands = cache_commands
+        self._lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(template, fingerprint):
+        return hashlib.sha256(f"{fingerprint}\n{template}".encode()).hexdigest()[:24]
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'entries': self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # The cache is only an optimization
+
+    def _expire(self, now):
+        expired = [k for k, e in self.entries.items() if now - e['created'] > self.ttl_seconds]
+        for key in expired:
+            del self.entries[key]
+        if len(self.entries) > self.max_entries:
+            by_use = sorted(self.entries, key=lambda k: self.entries[k]['last_used'])
+            for key in by_use[:len(self.entries) - self.max_entries]:
+                del self.entries[key]
+        return bool(expired)
+
+    def lookup(self, task, platform_info):
+        """
+        Return (plan, {step_index: commands}, template) instantiated for
+        this task, or None.
+        """
+        template, params = extract_template(task)
+        key = self._key(template, platform_fingerprint(platform_info))
+        now = time.time()
+        with self._lock:
+            changed = self._expire(now)
+            entry = self.entries.get(key)
+            if entry is None or sorted(entry['params']) != sorted(params):
+                if changed:
+                    self._save()
+                return None
+            entry['last_used'] = now
+            entry['hits'] = entry.get('hits', 0) + 1
+            self._save()
+        plan = instantiate(entry['plan'], params)
+        commands = {int(i): instantiate(c, params) for i, c in entry.get('commands', {}).items()}
+        return plan, commands, template
+
+    def store(self, task, platform_info, plan, commands=None):
+        """Remember a plan (and optionally step commands) that completed"""
+        template, params = extract_template(task)
+        key = self._key(template, platform_fingerprint(platform_info))
+        now = time.time()
+        entry = {
+            'template': template,
+            'params': sorted(params),
+            'plan': templatize(plan, params),
+            'created': now,
+            'last_used': now,
+            'hits': 0,
+        }
+        if self.cache_commands and commands:
+            entry['commands'] = {str(i): templatize(c, params) for i, c in commands.items() if c}
+        with self._lock:
+            self.entries[key] = entry
+            self._expire(now)
+            self._save()
+
+    def forget(self, task, platform_info):
+        """Drop the entry a task maps to (e.g. after a cached plan failed)"""
+        template, _ = extract_template(task)
+        key = self._key(template, platform_fingerprint(platform_info))
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
@@ -0,0 +1,233 @@
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from core.deadline import budget
+from core.executor import TOOL_DEFINITIONS, SUBMIT_TOOL_NAME
+from core.plan_cache import extract_template
+from tools.command_catalog import get_command_catalog
+from tools.system_info import get_platform_info, build_shell_command
+from tools.validation import validate_command_safety, is_destructive
+
+COMPILE_TOOL_NAME = "submit_plan_commands"
+
+# Longest a single validation check may run
+CHECK_TIMEOUT_SECONDS = 30
+# Gathered context sent with the compile request
+MAX_CONTEXT_CHARS = 12000
+
+WORD = re.compile(r'\b[a-z][a-z0-9_+-]{1,30}\b')
+PORT = re.compile(r'\bport (\d{1,5})\b', re.IGNORECASE)
+# Words that are also command names but almost never mean the command in a plan
+NOT_COMMANDS = {'a', 'and', 'at', 'for', 'from', 'in', 'install', 'is', 'it', 'of', 'on', 'or', 'set', 'test',
+                'the', 'then', 'to', 'time', 'true', 'false', 'yes', 'which', 'with', 'file', 'link', 'users'}
+
+_submit_properties = next(d["function"]["parameters"]["properties"] for d in TOOL_DEFINITIONS
+                          if d["function"]["name"] == SUBMIT_TOOL_NAME)
+
+COMPILE_TOOL = {
+    "type": "function",
+    "function": {
+        "name": COMPILE_TOOL_NAME,
+        "description": "Submit the commands for every step of the plan at once.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "steps": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "step": {"type": "integer", "description": "1-based step number"},
+                            **_submit_properties,
+                            "checks": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Read-only commands that exit 0 only if the step achieved its goal"
+                            },
+                            "defer": {
+                                "type": "boolean",
+                                "description": "True if the commands depend on something only known after earlier steps run"
+                            }
+                        },
+                        "required": ["step", "commands"]
+                    }
+                }
+            },
+            "required": ["steps"]
+        }
+    }
+}
+
+
+def gather_context(task_description, plan, call_tool, max_workers=4, allowed=None):
+    """
+    Facts every step may need, gathered once and concurrently: which of the
+    commands the plan mentions are installed, the state of the paths it
+    names and whether its ports are in use. No LLM request is involved.
+    """
+    text = ' '.join([task_description] + [
+        f"{step.get('description', '')} {step.get('validation', '')}" for step in plan.get('steps', [])
+    ])
+    _, params = extract_template(text)
+    paths = [value for name, value in params.items() if name.startswith('path')]
+    catalog = get_command_catalog()
+    mentioned = dict.fromkeys(w for w in WORD.findall(text.lower()) if w not in NOT_COMMANDS)
+    commands = [w for w in mentioned if catalog.lookup(w) is not None][:30]
+    ports = list(dict.fromkeys(int(p) for p in PORT.findall(text) if int(p) < 65536))[:5]
+
+    calls = []
+    if commands:
+        calls.append(("available_commands", {"commands": commands}))
+    if paths:
+        calls.append(("probe_paths", {"paths": paths[:20]}))
+    calls.extend(("check_port_in_use", {"port": port}) for port in ports)
+    if allowed is not None:
+        calls = [call for call in calls if call[0] in allowed]
+    if not calls:
+        return {}
+
+    def run(call):
+        name, arguments = call
+        try:
+            return call_tool(name, arguments)
+        except Exception as e:
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = list(pool.map(run, calls))
+    return {f"{name}({json.dumps(arguments)})": result for (name, arguments), result in zip(calls, results)}
+
+
+def _validate(entry):
+    """The step's submitted result, or the reason it cannot be used"""
+    if entry.get('defer'):
+        return None, "the model deferred it until earlier steps have run"
+    commands = entry.get('commands')
+    if not isinstance(commands, list) or not commands or not all(isinstance(c, str) for c in commands):
+        return None, "no usable commands"
+    checks = entry.get('checks') or []
+    if not isinstance(checks, list) or not all(isinstance(c, str) for c in checks):
+        return None, "malformed checks"
+    for cmd in commands + checks:
+        safety = validate_command_safety(cmd)
+        if not safety['safe']:
+            return None, safety['reason']
+    for check in checks:
+        # Checks must only look; they run after the step without a prompt of their own
+        if is_destructive(check):
+            return None, f"check `{check}` would change the system"
+
+    result = {k: v for k, v in entry.items() if k not in ('step', 'defer')}
+    result['checks'] = checks
+    result['compiled'] = True
+    return result, None
+
+
+class PlanCompiler:
+    """
+    Compiled-plan mode for long tasks: instead of a tool loop per step,
+    shared context is gathered once and one completion returns the
+    commands and validation checks for every step. Steps the model defers
+    or whose answer does not validate, and steps whose checks fail after
+    running, fall back to step-by-step generation, so the number of LLM
+    round trips grows with failures rather than with steps.
+    """
+
+    def __init__(self, llm_client, executor):
+        self.llm_client = llm_client
+        self.executor = executor
+
+    def compile(self, task_description, plan, indices):
+        """
+        Ask for the commands of the given steps (1-based) in one request.
+        Returns {index: result} for the steps that validated.
+        """
+        steps = plan.get('steps', [])
+        print("🧩 Compiling commands for all steps in one request...\n")
+        context = gather_context(
+            task_description, plan, self.executor._call_tool,
+            getattr(self.llm_client, 'max_parallel_commands', 4), self.executor.tools.names()
+        )
+        context_text = json.dumps(context, indent=1, default=str)
+        if len(context_text) > MAX_CONTEXT_CHARS:
+            context_text = context_text[:MAX_CONTEXT_CHARS] + "\n... (truncated)"
+
+        platform_info = get_platform_info()
+        listing = '\n'.join(
+            f"{i}. {steps[i - 1]['description']}"
+            + (f"\n   Validation: {steps[i - 1]['validation']}" if steps[i - 1].get('validation') else '')
+            for i in indices
+        )
+        prompt = f"""System Context:
+- Platform: {platform_info.get('platform', 'Unknown')}
+- OS: {platform_info.get('distro', platform_info.get('os', 'Unknown'))}
+- Architecture: {platform_info.get('architecture', 'Unknown')}
+- Shell: {platform_info.get('shell', 'Unknown')} ({platform_info.get('shell_version', platform_info.get('shell_type', ''))})
+
+Overall task: {task_description}
+
+Steps (they run in this order, each after the previous one succeeded):
+{listing}
+
+Facts already gathered about this system:
+{context_text}
+
+Call {COMPILE_TOOL_NAME} once with an entry for every step listed. For each step give the
+commands, and in "checks" one or more read-only commands that exit 0 only if the step
+achieved its goal (e.g. `test -f /etc/app.conf`, `systemctl is-active nginx`). If a step's
+commands depend on output or state you cannot know until earlier steps have run, set
+"defer": true for it instead of guessing."""
+
+        self.llm_client.reset_conversation()
+        try:
+            response = self.llm_client.chat(prompt, tools=[COMPILE_TOOL])
+        except Exception as e:
+            print(f"⚠️  Plan compilation failed ({e}); generating steps one at a time\n")
+            return {}
+        finally:
+            self.llm_client.reset_conversation()
+
+        message = response.choices[0].message
+        entries = None
+        for tool_call in getattr(message, 'tool_calls', None) or []:
+            if tool_call.function.name == COMPILE_TOOL_NAME:
+                try:
+                    entries = json.loads(tool_call.function.arguments or '{}').get('steps')
+                except (ValueError, AttributeError):
+                    pass
+        if entries is None and message.content:
+            entries = (self.executor._parse_llm_response(message.content) or {}).get('steps')
+        if not isinstance(entries, list):
+            print("⚠️  No compiled commands in the answer; generating steps one at a time\n")
+            return {}
+
+        compiled = {}
+        for entry in entries:
+            try:
+                index = int(entry.get('step'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if index not in indices:
+                continue
+            result, reason = _validate(entry)
+            if result is None:
+                print(f"  Step {index}: will be generated step by step ({reason})")
+            else:
+                compiled[index] = result
+        print(f"🧩 Compiled {len(compiled)}/{len(indices)} steps\n")
+        return compiled
+
+    def run_checks(self, checks):
+        """Run a step's validation checks; returns None or why they failed"""
+        deadline = getattr(self.llm_client, 'deadline', None)
+        for check in checks:
+            result = self.executor.policy.run(
+                build_shell_command(check), timeout=budget(deadline, CHECK_TIMEOUT_SECONDS), merge_stderr=True
+            )
+            if result["timed_out"] or result["returncode"] != 0:
+                print(f"🧪 Check failed: {check}")
+                output = result["stdout"].strip()[-500:]
+                return f"check `{check}` " + ("timed out" if result["timed_out"] else
+                                              f"exited with {result['returncode']}") + (f": {output}" if output else "")
+            print(f"🧪 Check passed: {check}")
+        return None
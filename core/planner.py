@@ -1,5 +1,10 @@
 import json
+import time
 from core.llm_client import LLMClient
+from core.metrics import current_metrics
+from core.checkpoint import RunCheckpoint
+from core.plan_cache import PlanCache
+from core.plan_compiler import PlanCompiler
 from core.executor import CommandExecutor, TOOL_DEFINITIONS
 from tools.system_info import get_platform_info
 
@@ -8,54 +13,138 @@ class LongTaskPlanner:
     def __init__(self, llm_client: LLMClient):
         self.llm_client = llm_client
         self.executor = CommandExecutor(llm_client)
+        self.compiler = PlanCompiler(llm_client, self.executor)
+        self.compile_plans = getattr(llm_client, 'compile_plans', False)
+        self.plan_cache = None
+        if getattr(llm_client, 'plan_cache', False):
+            self.plan_cache = PlanCache(
+                getattr(llm_client, 'plan_cache_path', None) or '~/.cache/can-you/plan_cache.json',
+                ttl_days=getattr(llm_client, 'plan_cache_ttl_days', 30),
+                max_entries=getattr(llm_client, 'plan_cache_max_entries', 200),
+                cache_commands=getattr(llm_client, 'plan_cache_commands', False)
+            )
     
-    def execute_long_task(self, task_description, auto_confirm=False, dry_run=False):
-        """Execute a multi-step task with planning"""
-        print(f"\n🎯 Long Task Mode: {task_description}\n")
-        print("📊 Planning phase...\n")
-        
-        # Phase 1: Planning
-        plan = self._create_plan(task_description)
+    def execute_long_task(self, task_description, auto_confirm=False, dry_run=False, resume_run_id=None,
+                          session_context=None, replan=False, compiled=None):
+        """
+        Execute a multi-step task with planning. Returns the run status.
+        A cached plan for a task of the same shape is reused unless replan.
+        With compiled (default: the compile_plans setting), the commands for
+        all steps come from one request (see PlanCompiler).
+        With a deadline on the client, steps stop when it passes and the run
+        can be resumed later.
+        """
+        runs_dir = getattr(self.llm_client, 'runs_dir', None) or '~/.cache/can-you/runs'
+        deadline = getattr(self.llm_client, 'deadline', None)
+        cached = None
         
-        if not plan:
-            print("❌ Failed to create a plan")
-            return
+        if resume_run_id:
+            checkpoint = RunCheckpoint.load(resume_run_id, runs_dir)
+            if not checkpoint:
+                print(f"❌ No saved run found with ID {resume_run_id}")
+                return "error"
+            task_description = checkpoint.task
+            plan = checkpoint.plan
+            print(f"\n🎯 Long Task Mode: {task_description}\n")
+            print(f"♻️  Resuming run {resume_run_id}\n")
+        else:
+            print(f"\n🎯 Long Task Mode: {task_description}\n")
+            
+            # Phase 1: Planning (plans that depend on session context are not cached)
+            if self.plan_cache and not replan and not session_context:
+                cached = self.plan_cache.lookup(task_description, get_platform_info())
+            if cached:
+                plan, step_commands, template = cached
+                print(f"♻️  Reusing cached plan for \"{template}\" (use --replan to plan afresh)\n")
+            else:
+                print("📊 Planning phase...\n")
+                plan = self._create_plan(task_description, session_context)
+                step_commands = {}
+            
+            if not plan:
+                print("❌ Failed to create a plan")
+                return "deadline_exceeded" if deadline is not None and deadline.expired() else "error"
+            
+            checkpoint = RunCheckpoint.create(task_description, plan, runs_dir)
+            for index, response in step_commands.items():
+                checkpoint.record_commands(index, response)
+            print(f"💾 Run ID: {checkpoint.run_id} (resume with --resume {checkpoint.run_id})\n")
         
         print("📋 Execution Plan:")
         steps = plan.get('steps', [])
         for i, step in enumerate(steps, 1):
-            print(f"  {i}. {step['description']}")
+            done = " ✅ (completed)" if checkpoint.is_completed(i) else ""
+            print(f"  {i}. {step['description']}{done}")
             if 'validation' in step:
                 print(f"     Validation: {step['validation']}")
         print()
         
         # Ask for plan approval
         if not auto_confirm:
+            asked = time.perf_counter()
             response = input("Proceed with this plan? (y/N): ")
+            if current_metrics():
+                current_metrics().record_user_wait(time.perf_counter() - asked)
             if response.lower() != 'y':
                 print("❌ Plan rejected by user")
-                return
+                return "cancelled"
+        
+        # Steps without commands yet get them from one request
+        pending = [i for i in range(1, len(steps) + 1)
+                   if not checkpoint.is_completed(i) and not checkpoint.cached_commands(i)]
+        if (self.compile_plans if compiled is None else compiled) and pending:
+            for index, response in self.compiler.compile(task_description, plan, pending).items():
+                checkpoint.record_commands(index, response)
         
         # Phase 2: Execute each step
         print("\n🚀 Executing plan...\n")
+        status = "completed"
         for i, step in enumerate(steps, 1):
+            if checkpoint.is_completed(i):
+                print(f"⏭️  Step {i}/{len(steps)} already completed, skipping")
+                continue
+            
+            if deadline is not None and deadline.expired():
+                print(f"\n⏰ Deadline of {deadline.seconds:g}s exceeded before step {i}.")
+                print(f"   Resume with --resume {checkpoint.run_id}")
+                status = "deadline_exceeded"
+                break
+            
             print(f"\n{'='*60}")
             print(f"Step {i}/{len(steps)}: {step['description']}")
             print(f"{'='*60}\n")
             
             # Execute the step
-            success = self._execute_step(step, auto_confirm, dry_run)
+            success = self._execute_step(step, auto_confirm, dry_run, checkpoint, i)
+            
+            if not success and deadline is not None and deadline.expired():
+                print(f"\n⏰ Deadline of {deadline.seconds:g}s exceeded during step {i}.")
+                print(f"   Resume with --resume {checkpoint.run_id}")
+                status = "deadline_exceeded"
+                break
             
             if not success and not dry_run:
                 print(f"\n❌ Step {i} failed. Aborting remaining steps.")
+                print(f"   Fix the problem and resume with --resume {checkpoint.run_id}")
+                status = "failed"
                 break
             
             if i < len(steps):
                 print(f"\n✅ Step {i} completed. Moving to next step...\n")
         
-        print("\n✨ Long task completed!")
+        checkpoint.finish("dry_run" if dry_run and status == "completed" else status)
+        if self.plan_cache and not dry_run and not session_context:
+            if status == "completed":
+                commands = {i: checkpoint.cached_commands(i) for i in range(1, len(steps) + 1)}
+                self.plan_cache.store(task_description, get_platform_info(), plan, commands)
+            elif cached and status == "failed":
+                # Don't keep offering a plan that just failed
+                self.plan_cache.forget(task_description, get_platform_info())
+        if status == "completed":
+            print("\n✨ Long task completed!")
+        return status
     
-    def _create_plan(self, task_description):
+    def _create_plan(self, task_description, session_context=None):
         """Ask LLM to create a multi-step plan"""
         # Get platform information
         platform_info = get_platform_info()
@@ -91,6 +180,8 @@ Output your plan in this JSON format:
 }}
 ```
 """
+        if session_context:
+            planning_prompt = f"Earlier in this session (the task may refer to these):\n{session_context}\n{planning_prompt}"
         
         try:
             response = self.llm_client.chat(
@@ -116,8 +207,8 @@ Output your plan in this JSON format:
             print(f"❌ Planning error: {e}")
             return None
     
-    def _execute_step(self, step, auto_confirm, dry_run):
-        """Execute a single step from the plan"""
+    def _execute_step(self, step, auto_confirm, dry_run, checkpoint, index):
+        """Execute a single step from the plan, recording it in the checkpoint"""
         step_description = step['description']
         
         # Show validation requirements
@@ -130,10 +221,62 @@ Output your plan in this JSON format:
                 print(f"  - {risk}")
             print()
         
-        # Reset conversation for this step
-        self.llm_client.reset_conversation()
+        checkpoint.start_step(index)
         
-        # Use the executor to handle this step
-        self.executor.execute_quick_task(step_description, auto_confirm, dry_run)
+        cached = checkpoint.cached_commands(index)
+        if cached and cached.get('compiled'):
+            outcome = self._execute_compiled(step_description, cached, auto_confirm, dry_run, checkpoint, index)
+        elif cached:
+            # Commands were generated in an earlier attempt; skip the LLM
+            print("♻️  Reusing previously generated commands for this step\n")
+            outcome = self.executor._execute_commands(cached, auto_confirm, dry_run)
+        else:
+            # Reset conversation for this step
+            self.llm_client.reset_conversation()
+            
+            # Use the executor to handle this step
+            outcome = self.executor.execute_quick_task(
+                step_description, auto_confirm, dry_run,
+                on_commands=lambda result: checkpoint.record_commands(index, result)
+            )
         
-        return True  # Assume success unless explicitly failed
+        status = (outcome or {}).get("status")
+        success = status in ("completed", "dry_run", "no_commands")
+        # Dry-run steps keep their cached commands but are not marked done, and
+        # neither are steps that produced no commands: nothing ran, so a resumed
+        # run asks for them again
+        checkpoint.record_outcome(index, outcome, completed=status == "completed" and not dry_run)
+        return success
+    
+    def _execute_compiled(self, step_description, compiled, auto_confirm, dry_run, checkpoint, index):
+        """
+        Run a step's compiled commands and its checks. If either fails, the
+        step is generated again with the usual tool loop, told what failed.
+        """
+        print("🧩 Using compiled commands for this step\n")
+        outcome = self.executor._execute_commands(compiled, auto_confirm, dry_run)
+        status = outcome.get("status")
+        if dry_run or status in ("cancelled", "blocked", "deadline_exceeded"):
+            return outcome
+        
+        if status == "completed":
+            reason = self.compiler.run_checks(compiled.get('checks') or [])
+            if reason is None:
+                return outcome
+        else:
+            failed = next((e for e in outcome.get("executions", []) if e.get("exit_code") != 0), {})
+            reason = f"`{failed.get('command')}` " + (
+                f"exited with {failed['exit_code']}" if failed.get("exit_code") is not None
+                else f"failed ({failed.get('error', 'error')})")
+            output = (failed.get("stderr") or failed.get("stdout") or '').strip()[-500:]
+            if output:
+                reason += f": {output}"
+        
+        print(f"\n🔁 Compiled commands did not validate ({reason.splitlines()[0]}); generating this step interactively\n")
+        self.llm_client.reset_conversation()
+        tried = '\n'.join(f"  {cmd}" for cmd in compiled.get('commands', []))
+        return self.executor.execute_quick_task(
+            step_description, auto_confirm, dry_run,
+            on_commands=lambda result: checkpoint.record_commands(index, result),
+            session_context=f"These commands were already run for this step:\n{tried}\nThey did not work: {reason}"
+        )
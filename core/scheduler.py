@@ -0,0 +1,72 @@
+import heapq
+import itertools
+import threading
+import time
+from core.metrics import percentile
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of LLM turns across tenants in front of one
+    shared RateBudget. Each waiting turn gets a virtual finish tag of
+    max(virtual clock, tenant's last tag) + 1/weight, and turns are let
+    through the budget in tag order, so a tenant with weight 2 gets twice
+    the share of a weight-1 tenant while both are busy and an idle tenant
+    does not bank credit for later.
+    """
+
+    def __init__(self, rate_budget, weights=None, default_weight=1.0):
+        self.rate_budget = rate_budget
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self._cond = threading.Condition()
+        self._heap = []            # (tag, seq, tenant)
+        self._last_tag = {}        # tenant -> last finish tag
+        self._virtual_time = 0.0
+        self._dispatching = False
+        self._seq = itertools.count()
+        self.waits = {}            # tenant -> recent queue waits (seconds)
+
+    def weight(self, tenant):
+        return float(self.weights.get(tenant, self.default_weight)) or self.default_weight
+
+    def acquire(self, tenant):
+        """Block until this tenant's turn may start, then take a rate budget slot"""
+        queued = time.perf_counter()
+        with self._cond:
+            tag = max(self._virtual_time, self._last_tag.get(tenant, 0.0)) + 1.0 / self.weight(tenant)
+            self._last_tag[tenant] = tag
+            entry = (tag, next(self._seq), tenant)
+            heapq.heappush(self._heap, entry)
+            while self._dispatching or self._heap[0] is not entry:
+                self._cond.wait()
+            heapq.heappop(self._heap)
+            self._dispatching = True
+            self._virtual_time = tag
+        try:
+            # Only one turn waits on the budget at a time, so tag order holds
+            self.rate_budget.acquire()
+        finally:
+            with self._cond:
+                self._dispatching = False
+                self._cond.notify_all()
+        waits = self.waits.setdefault(tenant, [])
+        waits.append(time.perf_counter() - queued)
+        del waits[:-500]
+
+    def depth(self):
+        """LLM turns currently waiting"""
+        with self._cond:
+            return len(self._heap) + (1 if self._dispatching else 0)
+
+    def stats(self):
+        """Per-tenant queue wait percentiles"""
+        return {
+            tenant: {
+                "weight": self.weight(tenant),
+                "samples": len(waits),
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+            }
+            for tenant, waits in list(self.waits.items())
+        }
@@ -0,0 +1,356 @@
+import hmac
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from core.executor import CommandExecutor
+from core.planner import LongTaskPlanner
+from core.scheduler import FairScheduler
+from core.deadline import Deadline
+from core.messages import BLOB_STORE
+from core.singleflight import LLM_FLIGHTS, TOOL_FLIGHTS
+from core.metrics import percentile
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_FINISHED_JOBS = 1000
+SSE_KEEPALIVE_SECONDS = 15
+
+_local = threading.local()
+
+
+class OutputRouter:
+    """
+    stdout replacement that sends what a job thread prints to that job's
+    event stream; everything else goes to the real stdout. Output from
+    helper threads a job starts (parallel command runs) is not routed.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        job = getattr(_local, 'job', None)
+        if job is None:
+            return self.stream.write(text)
+        job.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Job:
+    """One submitted task and the events it produced"""
+
+    def __init__(self, task, mode, tenant, dry_run, deadline_seconds=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.task = task
+        self.mode = mode
+        self.tenant = tenant
+        self.dry_run = dry_run
+        # Counted from submission, so time spent queued uses up the budget too
+        self.deadline = Deadline(deadline_seconds) if deadline_seconds else None
+        self.status = "queued"
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []  # (event, data)
+        self._partial = ''
+        self._cond = threading.Condition()
+
+    def emit(self, event, data):
+        with self._cond:
+            self.events.append((event, data))
+            self._cond.notify_all()
+
+    def write(self, text):
+        """Turn printed output into one `log` event per line"""
+        self._partial += text
+        *lines, self._partial = self._partial.split('\n')
+        for line in lines:
+            if line.strip():
+                self.emit("log", {"line": line})
+
+    def wait_events(self, after, timeout):
+        """Events with index >= after, waiting up to timeout for new ones"""
+        with self._cond:
+            if len(self.events) <= after and self.finished is None:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "task": self.task,
+            "mode": self.mode,
+            "tenant": self.tenant,
+            "dry_run": self.dry_run,
+            "deadline_seconds": self.deadline.seconds if self.deadline else None,
+            "status": self.status,
+            "result": self.result,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+def _summarize_outcome(outcome):
+    """Outcome dict without full command output"""
+    if not isinstance(outcome, dict):
+        return outcome
+    summary = {k: v for k, v in outcome.items() if k != "executions"}
+    if "executions" in outcome:
+        summary["executions"] = [
+            {
+                "command": e.get("command"),
+                "exit_code": e.get("exit_code"),
+                "error": e.get("error"),
+                "duration_seconds": e.get("duration_seconds"),
+                "stdout_tail": (e.get("stdout") or '')[-2000:],
+                "stderr_tail": (e.get("stderr") or '')[-2000:],
+            }
+            for e in outcome["executions"]
+        ]
+    return summary
+
+
+class ApiServer:
+    """
+    Local HTTP API in front of the same executor and planner the CLI uses.
+    Tasks run on a worker pool inside this process; each gets its own fork
+    of the LLM client, and every LLM turn goes through a FairScheduler so
+    tenants share the provider rate budget by weight.
+
+      POST /tasks             {"task", "mode": quick|long, "tenant", "dry_run": true, "deadline_seconds"}
+      GET  /tasks/<id>        status and result
+      GET  /tasks/<id>/events server-sent events: log, status, done
+      GET  /metrics           queue depth, in-flight tasks, per-tenant latency
+      GET  /health
+    """
+
+    def __init__(self, llm_client, host='127.0.0.1', port=8765, workers=4, tenant_weights=None,
+                 allow_execute=False, token=None):
+        if allow_execute and not token:
+            # Without a token any local user (or web page posting to localhost) could run commands
+            raise ValueError("server_allow_execute requires server_token to be set")
+        self.llm_client = llm_client
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.allow_execute = allow_execute
+        self.token = token
+        self.scheduler = FairScheduler(llm_client.rate_budget, tenant_weights)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='can-you-job')
+        self.jobs = {}
+        self.tenants = {}  # tenant -> {"submitted", "completed", "failed", "latencies"}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def submit(self, task, mode='quick', tenant='default', dry_run=True, deadline_seconds=None):
+        job = Job(task, mode, tenant, dry_run, deadline_seconds)
+        with self._lock:
+            self.jobs[job.id] = job
+            stats = self.tenants.setdefault(tenant, {"submitted": 0, "completed": 0, "failed": 0, "latencies": []})
+            stats["submitted"] += 1
+            self._prune()
+        job.emit("status", {"status": "queued"})
+        self.pool.submit(self._run, job)
+        return job
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.finished is not None]
+        if len(finished) > MAX_FINISHED_JOBS:
+            for job in sorted(finished, key=lambda j: j.finished)[:len(finished) - MAX_FINISHED_JOBS]:
+                del self.jobs[job.id]
+
+    def _run(self, job):
+        _local.job = job
+        job.started = time.time()
+        job.status = "running"
+        job.emit("status", {"status": "running"})
+        status = "error"
+        try:
+            client = self.llm_client.fork(self.scheduler, job.tenant)
+            client.deadline = job.deadline
+            # Nothing can answer a prompt here: plans and commands are approved
+            # by the request itself (execution needs dry_run=false and server permission)
+            if job.mode == 'long':
+                status = LongTaskPlanner(client).execute_long_task(job.task, auto_confirm=True, dry_run=job.dry_run)
+                job.result = {"status": status}
+            else:
+                outcome = CommandExecutor(client).execute_quick_task(job.task, auto_confirm=True, dry_run=job.dry_run)
+                job.result = _summarize_outcome(outcome)
+                status = (outcome or {}).get("status", "unknown")
+        except Exception as e:
+            job.result = {"status": "error", "error": str(e)}
+        finally:
+            _local.job = None
+            job.write('\n')
+            job.status = status
+            job.finished = time.time()
+            with self._lock:
+                stats = self.tenants[job.tenant]
+                stats["completed" if status in ("completed", "dry_run", "no_commands") else "failed"] += 1
+                stats["latencies"].append(job.finished - job.started)
+                del stats["latencies"][:-500]
+            job.emit("done", {"status": status, "result": job.result})
+
+    def metrics(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+            tenants = {t: dict(s, latencies=list(s["latencies"])) for t, s in self.tenants.items()}
+        waits = self.scheduler.stats()
+        per_tenant = {}
+        for tenant, stats in tenants.items():
+            latencies = stats.pop("latencies")
+            per_tenant[tenant] = dict(
+                stats,
+                weight=self.scheduler.weight(tenant),
+                task_seconds_p50=percentile(latencies, 50),
+                task_seconds_p95=percentile(latencies, 95),
+                llm_queue_wait_p50=waits.get(tenant, {}).get("wait_p50"),
+                llm_queue_wait_p95=waits.get(tenant, {}).get("wait_p95"),
+            )
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "queue_depth": sum(1 for j in jobs if j.status == "queued"),
+            "in_flight": sum(1 for j in jobs if j.status == "running"),
+            "llm_turns_waiting": self.scheduler.depth(),
+            "workers": self.workers,
+            "tenants": per_tenant,
+            "blob_store": BLOB_STORE.stats(),
+            "coalescing": {"llm": LLM_FLIGHTS.stats(), "tools": TOOL_FLIGHTS.stats()},
+        }
+
+    def serve_forever(self):
+        server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        server.daemon_threads = True
+        sys.stdout = OutputRouter(sys.stdout)
+        print(f"🌐 Serving on http://{self.host}:{self.port} ({self.workers} workers, "
+              f"{'execution allowed' if self.allow_execute else 'dry-run only'})")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            sys.stdout = sys.stdout.stream
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass  # Keep the console for job-less output
+
+            def _json(self, code, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self):
+                if not api.token:
+                    return True
+                supplied = self.headers.get('Authorization') or ''
+                if hmac.compare_digest(supplied.encode(), f"Bearer {api.token}".encode()):
+                    return True
+                self._json(401, {"error": "Missing or invalid bearer token"})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                parts = [p for p in urlparse(self.path).path.split('/') if p]
+                if parts == ['health']:
+                    return self._json(200, {"status": "ok"})
+                if parts == ['metrics']:
+                    return self._json(200, api.metrics())
+                if len(parts) in (2, 3) and parts[0] == 'tasks':
+                    job = api.get_job(parts[1])
+                    if job is None:
+                        return self._json(404, {"error": f"No task {parts[1]}"})
+                    if len(parts) == 2:
+                        return self._json(200, job.to_dict())
+                    if parts[2] == 'events':
+                        return self._stream(job)
+                self._json(404, {"error": "Not found"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                if urlparse(self.path).path.rstrip('/') != '/tasks':
+                    return self._json(404, {"error": "Not found"})
+                # Browsers only send JSON cross-origin after a CORS preflight, which this server never allows
+                content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+                if content_type != 'application/json':
+                    return self._json(415, {"error": "Content-Type must be application/json"})
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > MAX_BODY_BYTES:
+                    return self._json(413, {"error": "Request body too large"})
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError as e:
+                    return self._json(400, {"error": f"Invalid JSON: {e}"})
+                if not isinstance(body, dict):
+                    return self._json(400, {"error": "Expected a JSON object"})
+                task = str(body.get('task') or '').strip()
+                mode = body.get('mode', 'quick')
+                tenant = str(body.get('tenant') or self.headers.get('X-Tenant') or 'default')
+                dry_run = body.get('dry_run', True) is not False
+                deadline_seconds = body.get('deadline_seconds')
+                if deadline_seconds is not None and (
+                        isinstance(deadline_seconds, bool) or not isinstance(deadline_seconds, (int, float))
+                        or deadline_seconds <= 0):
+                    return self._json(400, {"error": "'deadline_seconds' must be a positive number"})
+                if not task:
+                    return self._json(400, {"error": "'task' is required"})
+                if mode not in ('quick', 'long'):
+                    return self._json(400, {"error": "'mode' must be 'quick' or 'long'"})
+                if not dry_run and not api.allow_execute:
+                    return self._json(403, {"error": "This server only runs dry-run tasks (server_allow_execute is off)"})
+                job = api.submit(task, mode, tenant, dry_run, deadline_seconds)
+                self._json(202, {"id": job.id, "status": job.status, "events": f"/tasks/{job.id}/events"})
+
+            def _stream(self, job):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    index = int(self.headers.get('Last-Event-ID', -1)) + 1
+                except ValueError:
+                    index = 0
+                try:
+                    while True:
+                        events = job.wait_events(index, SSE_KEEPALIVE_SECONDS)
+                        if not events:
+                            self.wfile.write(b": keepalive\n\n")
+                        for event, data in events:
+                            self.wfile.write(f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                            index += 1
+                            if event == "done":
+                                self.wfile.flush()
+                                return
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
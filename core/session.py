@@ -0,0 +1,218 @@
+import json
+import os
+import time
+from core.executor import CommandExecutor
+from core.planner import LongTaskPlanner
+from core.metrics import start_run_metrics, finish_run_metrics
+from core.deadline import Deadline
+from tools.system_info import get_platform_info
+
+try:
+    import readline
+except ImportError:  # Windows / minimal builds
+    readline = None
+
+DEFAULT_REPL_HISTORY = '~/.cache/can-you/repl_history'
+
+# Per-task caps for the compacted context carried into the next task
+FINDING_CHARS = 300
+OUTPUT_CHARS = 300
+MAX_FINDINGS = 6
+
+HELP = """Type a task in plain language. Follow-ups can refer to earlier tasks
+("now do the same for /var/log").
+
+  :long <task>   plan and run a multi-step task
+  :dry           toggle dry-run mode
+  :yes           toggle auto-confirm
+  :context       show what is carried over from earlier tasks
+  :reset         forget earlier tasks
+  :help          show this help
+  :quit          leave (or Ctrl-D)
+"""
+
+
+def _clip(text, limit):
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def compact_exchange(task, history, commands=None, outcome=None):
+    """
+    Reduce one task's conversation (Message records) to a few lines: the
+    task, what the tools found (clipped), the commands chosen and how they
+    ended.
+    """
+    lines = [f"Task: {task}"]
+
+    calls = {}
+    findings = []
+    for message in history:
+        if message.role == 'assistant':
+            for call in message.tool_calls or ():
+                calls[call.id] = (call.name, call.arguments)
+        elif message.role == 'tool':
+            name, arguments = calls.get(message.tool_call_id, (message.name, None))
+            if name == 'submit_commands':
+                continue
+            try:
+                arguments = json.dumps(json.loads(arguments), separators=(',', ':')) if arguments else ''
+            except (TypeError, ValueError):
+                arguments = str(arguments)
+            findings.append(f"  {name}({_clip(arguments, 120)}) -> {_clip(message.content or '', FINDING_CHARS)}")
+    if findings:
+        lines.append("Tool findings:")
+        lines.extend(findings[-MAX_FINDINGS:])
+
+    executions = {e.get('command'): e for e in (outcome or {}).get('executions', [])}
+    if commands:
+        lines.append("Commands:")
+        for cmd in commands:
+            execution = executions.get(cmd)
+            if execution is None:
+                lines.append(f"  {cmd}  (not run)")
+                continue
+            status = f"exit {execution['exit_code']}" if execution.get('exit_code') is not None else execution.get('error', 'error')
+            lines.append(f"  {cmd}  ({status})")
+            output = (execution.get('stdout') or '') + (execution.get('stderr') or '')
+            if output.strip():
+                lines.append(f"    output: {_clip(output, OUTPUT_CHARS)}")
+    if outcome:
+        lines.append(f"Result: {outcome.get('status', 'unknown')}")
+    return '\n'.join(lines)
+
+
+class InteractiveSession:
+    """
+    `can-you -i`: one warm process for a sequence of tasks. The LLM client,
+    its HTTP connections, the platform fingerprint and the tool caches
+    (command catalog, package and file indexes) stay loaded between tasks,
+    and a compacted summary of the last few tasks is sent with each new one
+    so follow-ups can build on them instead of rediscovering everything.
+    """
+
+    def __init__(self, llm_client, auto_confirm=False, dry_run=False, deadline_seconds=None):
+        self.llm_client = llm_client
+        self.deadline_seconds = deadline_seconds  # Budget for each task, not the session
+        self.executor = CommandExecutor(llm_client)
+        self.planner = LongTaskPlanner(llm_client)
+        self.auto_confirm = auto_confirm
+        self.dry_run = dry_run
+        self.context_tasks = getattr(llm_client, 'interactive_context_tasks', 5)
+        self.history_file = os.path.expanduser(getattr(llm_client, 'interactive_history_file', None) or DEFAULT_REPL_HISTORY)
+        self.context = []  # Compacted summaries of earlier tasks, oldest first
+
+    def _setup_readline(self):
+        if readline is None:
+            return
+        try:
+            readline.read_history_file(self.history_file)
+        except OSError:
+            pass
+        readline.set_history_length(1000)
+
+    def _save_readline(self):
+        if readline is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            readline.write_history_file(self.history_file)
+        except OSError:
+            pass
+
+    def session_context(self):
+        """Earlier tasks to send with the next one, or None"""
+        if not self.context or not self.context_tasks:
+            return None
+        return '\n\n'.join(self.context[-self.context_tasks:])
+
+    def _remember(self, summary):
+        if self.context_tasks:
+            self.context.append(summary)
+            del self.context[:-self.context_tasks]
+
+    def run_task(self, task, long_mode=False):
+        """Run one task with the warm client; returns its status"""
+        self.llm_client.reset_conversation()
+        self.llm_client.deadline = Deadline(self.deadline_seconds) if self.deadline_seconds else None
+        if getattr(self.llm_client, 'record_history', False):
+            # Startup is measured from here, not from process start
+            start_run_metrics('long' if long_mode else 'quick', self.llm_client.model, since=time.perf_counter())
+
+        status = "interrupted"
+        try:
+            if long_mode:
+                status = self.planner.execute_long_task(
+                    task, self.auto_confirm, self.dry_run, session_context=self.session_context()
+                )
+                self._remember(f"Task: {task}\nResult: {status} (multi-step plan)")
+            else:
+                chosen = []
+                outcome = self.executor.execute_quick_task(
+                    task, self.auto_confirm, self.dry_run,
+                    on_commands=lambda result: chosen.extend(result.get('commands', [])),
+                    session_context=self.session_context()
+                )
+                status = (outcome or {}).get("status", "unknown")
+                self._remember(compact_exchange(task, self.llm_client.conversation_history, chosen, outcome))
+        finally:
+            finish_run_metrics(status, getattr(self.llm_client, 'history_db', None) or '~/.cache/can-you/history.db')
+        return status
+
+    def _command(self, line):
+        """Handle a :command; returns False to leave the session"""
+        name, _, argument = line[1:].partition(' ')
+        if name in ('q', 'quit', 'exit'):
+            return False
+        if name == 'help':
+            print(HELP)
+        elif name == 'dry':
+            self.dry_run = not self.dry_run
+            print(f"🔍 Dry run {'on' if self.dry_run else 'off'}")
+        elif name == 'yes':
+            self.auto_confirm = not self.auto_confirm
+            print(f"⚡ Auto-confirm {'on' if self.auto_confirm else 'off'}")
+        elif name == 'reset':
+            self.context = []
+            print("🧹 Earlier tasks forgotten")
+        elif name == 'context':
+            print(self.session_context() or "(nothing carried over yet)")
+        elif name == 'long':
+            if argument.strip():
+                self.run_task(argument.strip(), long_mode=True)
+            else:
+                print("Usage: :long <task>")
+        else:
+            print(f"Unknown command :{name} (try :help)")
+        return True
+
+    def run(self):
+        """Read tasks until :quit or EOF"""
+        self._setup_readline()
+        platform_info = get_platform_info()  # Warm the fingerprint before the first task
+        print(f"💡 can-you interactive on {platform_info.get('distro', platform_info.get('platform', 'unknown'))} "
+              f"({platform_info.get('shell', 'unknown shell')}). Type :help for commands, :quit to leave.")
+        try:
+            while True:
+                try:
+                    line = input("\ncan-you> ").strip()
+                except EOFError:
+                    print()
+                    break
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                if not line:
+                    continue
+                try:
+                    if line.startswith(':'):
+                        if not self._command(line):
+                            break
+                    else:
+                        self.run_task(line)
+                except KeyboardInterrupt:
+                    print("\n⚠️  Task interrupted")
+                except Exception as e:
+                    print(f"\n❌ Error: {e}")
+        finally:
+            self._save_readline()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_SHARED_CACHE_PATH = '~/.cache/can-you/shared_cache.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+"""
+
+# Hits refresh an entry's LRU timestamp at most this often (avoids a write per read)
+TOUCH_INTERVAL_SECONDS = 60
+# Check the total size every this many writes
+EVICT_CHECK_EVERY = 20
+
+
+def cache_key(*parts):
+    """Stable key for JSON-serializable parts"""
+    text = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SharedCache:
+    """
+    Host-wide cache shared by every can-you process: one SQLite database in
+    WAL mode, so readers never block writers and concurrent processes see
+    each other's entries. Values are JSON. Each entry carries a version
+    (e.g. the mtime of the file it was derived from) and an optional
+    expiry; a lookup with a different version is a miss. When the database
+    grows past max_bytes, least recently used entries are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_SHARED_CACHE_PATH, max_bytes=128 * 1024 * 1024):
+        self.path = Path(os.path.expanduser(path))
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, version=''):
+        """Cached value, or None on a miss, version change or expiry"""
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                "SELECT version, value, accessed, expires FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[0] != str(version) or (row[3] is not None and row[3] < now):
+                self.misses += 1
+                return None
+            if now - row[2] > TOUCH_INTERVAL_SECONDS:
+                self._conn().execute(
+                    "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+            self.hits += 1
+            return json.loads(row[1])
+        except (sqlite3.Error, ValueError):
+            self.misses += 1
+            return None
+
+    def put(self, namespace, key, value, version='', ttl_seconds=None):
+        """Store a JSON-serializable value (replacing any older version)"""
+        try:
+            text = json.dumps(value, separators=(',', ':'), default=str)
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        try:
+            self._conn().execute(
+                """INSERT OR REPLACE INTO entries (namespace, key, version, value, size, created, accessed, expires)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (namespace, key, str(version), text, len(text), now, now,
+                 now + ttl_seconds if ttl_seconds else None)
+            )
+            self._writes += 1
+            if self._writes % EVICT_CHECK_EVERY == 0:
+                self.evict()
+        except sqlite3.Error:
+            pass  # A busy or read-only cache only costs the speedup
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes"""
+        conn = self._conn()
+        try:
+            conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = total - int(self.max_bytes * 0.9)
+            freed = 0
+            doomed = []
+            for namespace, key, size in conn.execute(
+                    "SELECT namespace, key, size FROM entries ORDER BY accessed"):
+                doomed.append((namespace, key))
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", doomed)
+        except sqlite3.Error:
+            pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_shared_cache(path=DEFAULT_SHARED_CACHE_PATH, max_mb=128):
+    """Process-wide SharedCache for a database path, or None if it cannot be opened"""
+    with _caches_lock:
+        if path not in _caches:
+            try:
+                _caches[path] = SharedCache(path, int(max_mb * 1024 * 1024))
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️  Shared cache unavailable ({e})")
+                _caches[path] = None
+        return _caches[path]
+
+
+def file_version(path):
+    """Version string for something derived from a file or directory"""
+    try:
+        st = os.stat(os.path.expanduser(path))
+        return f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return 'missing'
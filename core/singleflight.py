@@ -0,0 +1,82 @@
+import threading
+import time
+from core.deadline import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a call for a key is in flight, identical
+    calls from other threads wait for it and get the same result (or
+    exception) instead of running again. Nothing is kept once the call
+    returns; caching is the shared cache's job.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        fn() once per key at a time. Returns (result, shared), where shared
+        is True if the result came from another thread's call. A waiter
+        gives up with TimeoutError after timeout seconds. If the call it
+        waited for ran out of its own deadline, the waiter tries again
+        (running fn itself if no other call has started) rather than
+        failing on a budget that was not its own.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        joined = False
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    leader = True
+                    self.executed += 1
+                else:
+                    leader = False
+                    if not joined:
+                        self.coalesced += 1
+                        joined = True
+            if leader:
+                break
+            if not call.done.wait(None if give_up is None else max(0.0, give_up - time.monotonic())):
+                raise TimeoutError(f"Gave up waiting for an identical in-flight {self.name} call")
+            if isinstance(call.error, DeadlineExceeded):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": in_flight}
+
+
+# Process-wide, so forked LLM clients and every executor share them
+LLM_FLIGHTS = SingleFlight('LLM')
+TOOL_FLIGHTS = SingleFlight('tool')
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from core.plan_cache import extract_template, platform_fingerprint, templatize, instantiate, MARKER
+
+DEFAULT_TASK_MEMORY_PATH = '~/.cache/can-you/task_memory.json'
+
+STOP_WORDS = {
+    'a', 'an', 'the', 'all', 'any', 'every', 'some', 'of', 'in', 'on', 'at', 'to', 'for', 'from', 'with',
+    'and', 'or', 'my', 'me', 'i', 'please', 'that', 'which', 'is', 'are', 'under', 'inside', 'into', 'this',
+}
+# Parameters that may differ between a task and the earlier one it reuses
+REBINDABLE_KINDS = ('path', 'number')
+TOKEN = re.compile(r'\{([a-z]+)\d+\}|[a-z0-9]+')
+
+
+def task_tokens(template):
+    """Content words of a task template; parameters count as their kind"""
+    tokens = []
+    for match in TOKEN.finditer(template):
+        if match.group(1):
+            tokens.append(f"<{match.group(1)}>")
+            continue
+        word = match.group(0)
+        if word in STOP_WORDS:
+            continue
+        # Cheap plural folding: files -> file, directories -> directory
+        if len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _tfidf(tokens, idf):
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    vector = {t: c * idf.get(t, 1.0) for t, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {t: v / norm for t, v in vector.items()}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+class TaskMemory:
+    """
+    Past quick tasks that completed, with the commands that did it, for
+    near-duplicate matching. Tasks are compared as TF-IDF vectors over
+    their template words (paths, hosts, numbers... reduced to their kind),
+    so "find pdf files in ~/docs" matches "find all PDF files in
+    ~/Documents". Commands are stored with the task's parameters replaced
+    by slots and re-bound to the new task's values on reuse.
+
+    Similarity is only good enough for a hint: "files owned by root" and
+    "files not owned by root" score as near-duplicates. An earlier answer
+    is reusable as is only for the same normalized template with nothing
+    but paths and numbers changed.
+    """
+
+    def __init__(self, path=DEFAULT_TASK_MEMORY_PATH, max_entries=500):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.entries = []
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f).get('entries', [])
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'entries': self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Only an optimization
+
+    def _idf(self, entries):
+        document_frequency = {}
+        for entry in entries:
+            for token in set(entry['tokens']):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        n = len(entries) + 1
+        return {t: math.log(n / (1 + df)) + 1.0 for t, df in document_frequency.items()}
+
+    def find(self, task, platform_info):
+        """
+        Best earlier task for this platform: {entry, score, params,
+        result, reusable} or None. `result` has the earlier commands with
+        this task's parameters filled in; `reusable` is True only for the
+        same template with changed paths/numbers that all have a slot in
+        the commands.
+        """
+        template, params = extract_template(task)
+        fingerprint = platform_fingerprint(platform_info)
+        with self._lock:
+            candidates = [e for e in self.entries if e['fingerprint'] == fingerprint]
+        if not candidates:
+            return None
+
+        exact = next((e for e in candidates if e['template'] == template), None)
+        if exact is not None:
+            changed = {name for name in params if exact['params'].get(name) != params[name]}
+            reusable = (sorted(exact['params']) == sorted(params)
+                        and all(name.startswith(REBINDABLE_KINDS) for name in changed)
+                        and changed <= set(exact['bound']))
+            return {"entry": exact, "score": 1.0, "params": params, "result": instantiate(exact['result'], params),
+                    "reusable": reusable}
+
+        idf = self._idf(candidates)
+        query = _tfidf(task_tokens(template), idf)
+        best, best_score = None, 0.0
+        for entry in candidates:
+            score = _cosine(query, _tfidf(entry['tokens'], idf))
+            if score > best_score:
+                best, best_score = entry, score
+        if best is None:
+            return None
+
+        same_kinds = sorted(best['params']) == sorted(params)
+        result = instantiate(best['result'], params) if same_kinds else best['original']
+        return {"entry": best, "score": round(best_score, 3), "params": params, "result": result,
+                "reusable": False}
+
+    def record(self, task, platform_info, result, path_state=None):
+        """Remember a task whose commands completed successfully"""
+        template, params = extract_template(task)
+        templated = templatize(result, params)
+        text = json.dumps(templated, ensure_ascii=False)
+        entry = {
+            'task': task,
+            'template': template,
+            'tokens': task_tokens(template),
+            'params': params,
+            'bound': [name for name in params if MARKER.format(name) in text],
+            'path_state': path_state or {},
+            'fingerprint': platform_fingerprint(platform_info),
+            'result': templated,
+            'original': result,
+            'created': time.time(),
+        }
+        with self._lock:
+            # One entry per template; the newest answer wins
+            self.entries = [e for e in self.entries
+                            if not (e['template'] == template and e['fingerprint'] == entry['fingerprint'])]
+            self.entries.append(entry)
+            del self.entries[:-self.max_entries]
+            self._save()
+
+
+def path_params(params):
+    """Parameters that name filesystem paths"""
+    return {name: value for name, value in params.items() if name.startswith('path')}
@@ -0,0 +1,92 @@
+import re
+from core.plan_cache import extract_template
+
+# Sent on every turn whatever the task, and cannot be disabled
+CORE_TOOLS = {'submit_commands', 'available_commands', 'get_command_help'}
+
+# Words in a task that make a tool worth offering. Tasks naming a path also
+# get the path tools, tasks with a URL, IP address or host name the network ones.
+TOOL_KEYWORDS = {
+    'get_man_page': {'man', 'manual', 'option', 'flag', 'syntax', 'documentation'},
+    'get_file_tree': {'directory', 'folder', 'dir', 'tree', 'project', 'structure', 'repo', 'repository',
+                      'file', 'subdirectory', 'content', 'organize', 'layout'},
+    'check_file_exists': {'file', 'exist', 'exists', 'path', 'log', 'copy', 'move', 'rename', 'delete', 'remove',
+                          'backup', 'symlink', 'link'},
+    'probe_paths': {'file', 'path', 'directory', 'folder', 'copy', 'move', 'rename', 'delete', 'remove',
+                    'compress', 'archive', 'extract', 'zip', 'tar', 'backup', 'sync', 'mount'},
+    'read_config_file': {'config', 'configuration', 'conf', 'setting', 'ini', 'yaml', 'yml', 'json', 'toml',
+                         'env', 'read', 'edit', 'change', 'modify', 'enable', 'disable', 'cron', 'crontab'},
+    'check_port_in_use': {'port', 'listen', 'listening', 'server', 'serve', 'http', 'https', 'web', 'nginx',
+                          'apache', 'bind', 'socket', 'proxy', 'api', 'database', 'ssh', 'firewall'},
+    'get_disk_space': {'disk', 'space', 'storage', 'free', 'full', 'partition', 'mount', 'usage', 'size',
+                       'large', 'big', 'biggest', 'largest', 'backup', 'clean', 'cleanup', 'volume'},
+    'query_packages': {'install', 'installed', 'package', 'apt', 'yum', 'dnf', 'pacman', 'apk', 'brew', 'rpm',
+                       'dpkg', 'upgrade', 'update', 'uninstall', 'version', 'dependency', 'library', 'setup'},
+    'list_processes': {'process', 'running', 'memory', 'cpu', 'kill', 'pid', 'ram', 'hog', 'service',
+                       'daemon', 'top', 'slow', 'restart', 'stop', 'load', 'zombie'},
+    'check_write_permission': {'permission', 'write', 'writable', 'owner', 'ownership', 'chmod', 'chown',
+                               'access', 'sudo', 'root', 'copy', 'move', 'create', 'save', 'deploy'},
+    'search_files': {'find', 'search', 'locate', 'where', 'named', 'matching', 'file', 'pdf', 'image',
+                     'photo', 'video', 'document', 'duplicate', 'recent', 'older', 'newer', 'extension'},
+    'find_config_files': {'config', 'configuration', 'conf', 'setting', 'dotfile', 'rc'},
+}
+PATH_TOOLS = {'check_file_exists', 'probe_paths', 'get_file_tree', 'check_write_permission'}
+NETWORK_TOOLS = {'check_port_in_use'}
+
+WORD = re.compile(r'[a-z]+')
+
+
+def _forms(word):
+    """A word and its likely singular forms (files, processes, directories)"""
+    forms = {word}
+    if word.endswith('ies') and len(word) > 4:
+        forms.add(word[:-3] + 'y')
+    if word.endswith('es') and len(word) > 3:
+        forms.add(word[:-2])
+    if word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+        forms.add(word[:-1])
+    return forms
+
+
+class ToolRegistry:
+    """
+    The tool schemas offered to the model. Tools can be switched off in
+    config (tools_disabled, or an allow-list in tools_enabled), except for
+    the core tools every task relies on. With selection on each turn sends
+    only the tools relevant to the task plus those already used, since
+    every schema is resent on every turn. If the
+    model calls an enabled tool it was not offered, the caller expands the
+    set to every enabled tool for the rest of the task.
+    """
+
+    def __init__(self, definitions, enabled=None, disabled=None, selection=True):
+        names = [d["function"]["name"] for d in definitions]
+        allowed = set(enabled) | CORE_TOOLS if enabled else set(names)
+        allowed -= set(disabled or ()) - CORE_TOOLS
+        self.definitions = [d for d in definitions if d["function"]["name"] in allowed]
+        self.selection = selection
+
+    def is_enabled(self, name):
+        return any(d["function"]["name"] == name for d in self.definitions)
+
+    def names(self, definitions=None):
+        return {d["function"]["name"] for d in (self.definitions if definitions is None else definitions)}
+
+    def select(self, task_description, used=()):
+        """Schemas to send for a task, given the tools it has used so far"""
+        if not self.selection:
+            return self.definitions
+        template, params = extract_template(task_description)
+        words = set()
+        for word in WORD.findall(template.lower()):
+            words |= _forms(word)
+        chosen = set(CORE_TOOLS) | set(used)
+        for name, keywords in TOOL_KEYWORDS.items():
+            if words & keywords:
+                chosen.add(name)
+        kinds = {re.sub(r'\d+$', '', name) for name in params}
+        if 'path' in kinds:
+            chosen |= PATH_TOOLS
+        if kinds & {'url', 'ip', 'host'}:
+            chosen |= NETWORK_TOOLS
+        return [d for d in self.definitions if d["function"]["name"] in chosen]
@@ -7,12 +7,83 @@ from pathlib import Path
 # Add project root to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from core.llm_client import LLMClient
+from core.llm_client import LLMClient, load_config
 from core.executor import CommandExecutor
 from core.planner import LongTaskPlanner
+from core.metrics import start_run_metrics, finish_run_metrics, print_stats
+from core.session import InteractiveSession
+from core.server import ApiServer
+from core.deadline import Deadline
+from tools.file_index import start_file_index
+
+
+def stats_main(argv):
+    """`can-you stats`: latency percentiles and regressions from run history"""
+    parser = argparse.ArgumentParser(
+        prog='can-you stats',
+        description="Show p50/p95/p99 timings by mode, model and tool from recorded runs"
+    )
+    parser.add_argument('--days', type=int, default=30, help='Only include runs from the last N days (default: 30)')
+    parser.add_argument('--recent', type=int, default=20, help='Runs compared against the baseline (default: 20)')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Flag a regression when the recent median exceeds the baseline by this factor (default: 1.25)')
+    parser.add_argument('--db', default=None, help='History database (default: from config)')
+    args = parser.parse_args(argv)
+    
+    db_path = args.db
+    if db_path is None:
+        # Only the path is needed; no client, cache or connection setup
+        try:
+            config = load_config()
+        except FileNotFoundError:
+            config = {}
+        db_path = config.get('history_db', '~/.cache/can-you/history.db')
+    print_stats(db_path, days=args.days, recent=args.recent, threshold=args.threshold)
+
+
+def serve_main(argv):
+    """`can-you serve`: local HTTP API for submitting tasks"""
+    parser = argparse.ArgumentParser(
+        prog='can-you serve',
+        description="Serve a local HTTP API that queues tasks and streams their progress"
+    )
+    parser.add_argument('--host', default=None, help='Address to bind (default: from config, 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=None, help='Port to listen on (default: from config, 8765)')
+    parser.add_argument('--workers', type=int, default=None, help='Tasks run concurrently (default: from config, 4)')
+    args = parser.parse_args(argv)
+    
+    llm_client = LLMClient()
+    if llm_client.file_index_roots:
+        start_file_index(llm_client.file_index_roots)
+    try:
+        server = ApiServer(
+            llm_client,
+            host=args.host or llm_client.server_host,
+            port=args.port or llm_client.server_port,
+            workers=args.workers or llm_client.server_workers,
+            tenant_weights=llm_client.server_tenants,
+            allow_execute=llm_client.server_allow_execute,
+            token=llm_client.server_token
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
 
 
 def main():
+    # Subcommands (only when followed by options, so "stats of /var" stays a task)
+    argv = sys.argv[1:]
+    if argv and argv[0] in ('stats', 'serve') and (len(argv) == 1 or argv[1].startswith('-')):
+        if argv[0] == 'stats':
+            stats_main(argv[1:])
+        else:
+            serve_main(argv[1:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="AI-powered Linux command helper - generates commands based on natural language",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -22,16 +93,22 @@ Examples:
   %(prog)s -l set up a python web server with nginx
   %(prog)s --dry-run show disk usage for home directory
   %(prog)s -y compress all log files older than 30 days
+  %(prog)s --resume 20250101-120000-a1b2c3
+  %(prog)s --deadline 30 -y restart the nginx service
+  %(prog)s -i
 
 Modes:
   Default mode: Quick single-command generation
   -l mode: Multi-step planning for complex tasks
+  -i mode: Interactive session that keeps context between tasks
+  stats: Latency percentiles and regressions from run history (%(prog)s stats --help)
+  serve: Local HTTP API for other tools (%(prog)s serve --help)
         """
     )
     
     parser.add_argument(
         'task',
-        nargs='+',
+        nargs='*',
         help='Describe what you want to do in natural language'
     )
     
@@ -41,6 +118,12 @@ Modes:
         help='Enable long-form planning mode for multi-step tasks'
     )
     
+    parser.add_argument(
+        '-i', '--interactive',
+        action='store_true',
+        help='Interactive session: run tasks one after another in one warm process'
+    )
+    
     parser.add_argument(
         '-y', '--yes',
         action='store_true',
@@ -53,23 +136,89 @@ Modes:
         help='Show commands without executing them'
     )
     
+    parser.add_argument(
+        '--resume',
+        metavar='RUN_ID',
+        help='Resume an interrupted long-mode run, skipping completed steps'
+    )
+    
+    parser.add_argument(
+        '--replan',
+        action='store_true',
+        help='Ignore the plan cache and ask the LLM for a fresh plan (long mode)'
+    )
+    
+    parser.add_argument(
+        '--compile',
+        action='store_true',
+        help='Generate the commands for all plan steps in one request (long mode)'
+    )
+    
+    parser.add_argument(
+        '--fresh',
+        action='store_true',
+        help='Ask the LLM again instead of reusing cached answers to identical requests'
+    )
+    
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        metavar='SECONDS',
+        help='Give up after this many seconds overall: LLM requests, tools and commands '
+             'get only what is left (per task with -i)'
+    )
+    
     args = parser.parse_args()
     
+    if not args.task and not args.resume and not args.interactive:
+        parser.error('the following arguments are required: task')
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error('--deadline must be positive')
+    # Started before the client loads, so the budget covers the whole run
+    deadline = Deadline(args.deadline) if args.deadline and not args.interactive else None
+    
     # Combine task words into description
     task_description = ' '.join(args.task)
     
     try:
         # Initialize LLM client
         llm_client = LLMClient()
+        llm_client.fresh = args.fresh
         
-        if args.long:
-            # Use planner for complex tasks
-            planner = LongTaskPlanner(llm_client)
-            planner.execute_long_task(task_description, args.yes, args.dry_run)
-        else:
-            # Use executor for quick tasks
-            executor = CommandExecutor(llm_client)
-            executor.execute_quick_task(task_description, args.yes, args.dry_run)
+        if args.interactive:
+            # Optional background filesystem index for fast path lookups; a
+            # one-shot run would exit long before a full scan pays off
+            if llm_client.file_index_roots:
+                start_file_index(llm_client.file_index_roots)
+            session = InteractiveSession(llm_client, args.yes, args.dry_run, deadline_seconds=args.deadline)
+            if task_description:
+                session.run_task(task_description, long_mode=args.long)
+            session.run()
+            return
+        
+        long_mode = bool(args.long or args.resume)
+        llm_client.deadline = deadline
+        if llm_client.record_history:
+            start_run_metrics('long' if long_mode else 'quick', llm_client.model)
+        
+        status = "interrupted"
+        try:
+            if long_mode:
+                # Use planner for complex tasks
+                planner = LongTaskPlanner(llm_client)
+                status = planner.execute_long_task(
+                    task_description, args.yes, args.dry_run, resume_run_id=args.resume, replan=args.replan,
+                    compiled=True if args.compile else None
+                )
+            else:
+                # Use executor for quick tasks
+                executor = CommandExecutor(llm_client)
+                outcome = executor.execute_quick_task(task_description, args.yes, args.dry_run)
+                status = (outcome or {}).get("status", "unknown")
+        finally:
+            finish_run_metrics(status, llm_client.history_db)
+        if status == "deadline_exceeded":
+            sys.exit(124)  # Same as timeout(1)
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupted by user")
@@ -0,0 +1,210 @@
+import json
+import os
+import re
+import subprocess
+import threading
+
+DEFAULT_CATALOG_PATH = '~/.cache/can-you/command_catalog.json'
+
+HELP_MAX_LINES = 300
+VERSION_PATTERN = re.compile(r'\d+(\.\d+)+')
+
+
+class CommandCatalog:
+    """
+    Catalog of executables on $PATH: name -> resolved path, size and mtime,
+    built with os.scandir and persisted between runs. Each PATH directory is
+    rescanned only when its mtime changes. Version strings and help text
+    are captured lazily, once per binary (path, size, mtime), and cached.
+    """
+
+    def __init__(self, cache_path=DEFAULT_CATALOG_PATH):
+        self.cache_path = os.path.expanduser(cache_path)
+        self.directories = {}  # dir -> {"mtime": ..., "commands": {name: [path, size, mtime]}}
+        self.details = {}      # "path:size:mtime" -> {"version": ..., "help": ...}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            self.directories = data.get('directories', {})
+            self.details = data.get('details', {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Persist the catalog if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'directories': self.directories, 'details': self.details}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass  # The catalog is only a cache
+
+    @staticmethod
+    def _path_dirs():
+        seen = []
+        for entry in os.environ.get('PATH', '').split(os.pathsep):
+            if entry and entry not in seen:
+                seen.append(entry)
+        return seen
+
+    @staticmethod
+    def _scan_dir(directory):
+        commands = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat()  # Follows symlinks to the real binary
+                    except OSError:
+                        continue
+                    if not (st.st_mode & 0o111) or entry.is_dir():
+                        continue
+                    commands[entry.name] = [os.path.realpath(entry.path), st.st_size, int(st.st_mtime)]
+        except OSError:
+            pass
+        return commands
+
+    def refresh(self):
+        """Rescan PATH directories whose mtime changed since the last scan"""
+        with self._lock:
+            for directory in self._path_dirs():
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    if self.directories.pop(directory, None) is not None:
+                        self._dirty = True
+                    continue
+                cached = self.directories.get(directory)
+                if cached is None or cached.get('mtime') != mtime:
+                    self.directories[directory] = {'mtime': mtime, 'commands': self._scan_dir(directory)}
+                    self._dirty = True
+            if self._dirty:
+                # Forget captured details of binaries that changed or disappeared
+                live = {
+                    f"{path}:{size}:{mtime}"
+                    for d in self.directories.values()
+                    for path, size, mtime in d.get('commands', {}).values()
+                }
+                self.details = {k: v for k, v in self.details.items() if k in live}
+        self.save()
+
+    def lookup(self, name):
+        """Resolve a command the way the shell would: first PATH match wins"""
+        if os.sep in name:
+            path = os.path.realpath(name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            return {'name': name, 'path': path, 'size': st.st_size, 'mtime': int(st.st_mtime)}
+        for attempt in range(2):
+            for directory in self._path_dirs():
+                commands = self.directories.get(directory, {}).get('commands', {})
+                if name in commands:
+                    path, size, mtime = commands[name]
+                    return {'name': name, 'path': path, 'size': size, 'mtime': mtime}
+            if attempt == 0:
+                # Something may have been installed since the last scan
+                self.refresh()
+        return None
+
+    def _details(self, info):
+        key = f"{info['path']}:{info['size']}:{info['mtime']}"
+        with self._lock:
+            return key, self.details.setdefault(key, {})
+
+    @staticmethod
+    def _run(path, flag, timeout):
+        try:
+            result = subprocess.run(
+                [path, flag],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                stdin=subprocess.DEVNULL
+            )
+            return result.stdout + result.stderr
+        except (OSError, subprocess.SubprocessError):
+            return ''
+
+    def version(self, info):
+        """Version line for a command, captured once with --version"""
+        key, details = self._details(info)
+        if 'version' not in details:
+            output = self._run(info['path'], '--version', timeout=3)
+            line = next((l.strip() for l in output.splitlines() if l.strip()), '')
+            details['version'] = line[:200] if VERSION_PATTERN.search(line) else None
+            with self._lock:
+                self._dirty = True
+            self.save()
+        return details['version']
+
+    def help_text(self, info):
+        """--help (or -h) output for a command, captured once"""
+        key, details = self._details(info)
+        if 'help' not in details:
+            output = self._run(info['path'], '--help', timeout=5)
+            if not output.strip():
+                output = self._run(info['path'], '-h', timeout=5)
+            lines = output.split('\n')
+            if len(lines) > HELP_MAX_LINES:
+                output = '\n'.join(lines[:HELP_MAX_LINES]) + f"\n\n... (truncated, {len(lines) - HELP_MAX_LINES} more lines)"
+            details['help'] = output if output.strip() else None
+            with self._lock:
+                self._dirty = True
+            self.save()
+        return details['help']
+
+    def __len__(self):
+        return len({name for d in self.directories.values() for name in d.get('commands', {})})
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_command_catalog():
+    """Process-wide catalog, loaded (and refreshed) on first use"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CommandCatalog()
+        return _catalog
+
+
+def available_commands(commands, include_version=False):
+    """
+    Check whether commands are installed, answered from the PATH catalog
+    instead of spawning `which`. Versions mean running each command with
+    --version, so they are only looked up when asked for.
+    """
+    try:
+        if isinstance(commands, str):
+            commands = [commands]
+        catalog = get_command_catalog()
+        results = []
+        for name in commands[:50]:
+            info = catalog.lookup(name)
+            if info is None:
+                results.append({"command": name, "installed": False})
+                continue
+            entry = {"command": name, "installed": True, "path": info['path']}
+            if include_version:
+                entry["version"] = catalog.version(info)
+            results.append(entry)
+        return {"commands": results, "catalog_size": len(catalog)}
+    except Exception as e:
+        return {"error": f"Error checking commands: {str(e)}"}
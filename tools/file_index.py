@@ -0,0 +1,370 @@
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import heapq
+import os
+import struct
+import threading
+
+# inotify event masks (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Directories that are never worth indexing
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.cache', '.venv', 'venv'}
+
+
+def _load_libc():
+    """Load libc with inotify symbols, or None if unavailable (non-Linux)"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class FileIndex:
+    """
+    In-memory path/metadata index for a set of root directories.
+    Built once with os.scandir, then kept fresh from inotify events
+    in a background thread so lookups never touch the filesystem.
+    Besides the entries themselves it keeps each directory's children
+    (subtree walks and removals touch only that subtree) and the paths
+    for each basename (name globs and substring searches look at names,
+    not at every path).
+    """
+
+    def __init__(self, roots, max_entries=500000):
+        self.roots = [os.path.abspath(os.path.expanduser(r)) for r in roots]
+        self.roots = [r for r in self.roots if os.path.isdir(r)]
+        self.max_entries = max_entries
+        # path -> (is_dir, size_bytes, mtime)
+        self.entries = {}
+        self._children = {}  # directory -> set of paths directly in it
+        self._by_name = {}  # basename -> set of paths
+        self.ready = threading.Event()
+        self.live = False  # True when inotify is keeping the index fresh
+        self.truncated = False
+        self._lock = threading.Lock()
+        self._watches = {}  # watch descriptor -> directory path
+        self._fd = None
+        self._libc = None
+        self._thread = None
+
+    def start(self):
+        """Build the index and start watching in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name='file-index', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self._libc = _load_libc()
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self.live = True  # Until a watch cannot be added
+        for root in self.roots:
+            self._add_tree(root)
+        self.ready.set()
+        if self._fd is not None:
+            self._watch_loop()
+
+    def _add_watch(self, directory):
+        if self._fd is None:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() == errno.ENOSPC:
+                # Out of inotify watches; the rest of the tree goes stale
+                self.live = False
+            return
+        self._watches[wd] = directory
+
+    def _put(self, path, meta):
+        """Add or refresh one entry; the caller holds the lock"""
+        if path not in self.entries:
+            self._children.setdefault(os.path.dirname(path), set()).add(path)
+            self._by_name.setdefault(os.path.basename(path), set()).add(path)
+        self.entries[path] = meta
+
+    def _add_tree(self, top):
+        """Index a directory and everything below it"""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            self._add_watch(directory)
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        with self._lock:
+                            if len(self.entries) >= self.max_entries:
+                                self.truncated = True
+                                return
+                            self._put(entry.path, (is_dir, st.st_size, int(st.st_mtime)))
+                        if is_dir and entry.name not in SKIP_DIRS:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _update(self, path):
+        try:
+            st = os.lstat(path)
+        except OSError:
+            self._remove(path)
+            return
+        is_dir = os.path.isdir(path) and not os.path.islink(path)
+        with self._lock:
+            self._put(path, (is_dir, st.st_size, int(st.st_mtime)))
+
+    def _remove(self, path):
+        """Drop a path and, if it was a directory, everything indexed below it"""
+        with self._lock:
+            stack = [path]
+            while stack:
+                p = stack.pop()
+                if self.entries.pop(p, None) is None:
+                    continue
+                siblings = self._children.get(os.path.dirname(p))
+                if siblings is not None:
+                    siblings.discard(p)
+                name = os.path.basename(p)
+                same_name = self._by_name.get(name)
+                if same_name is not None:
+                    same_name.discard(p)
+                    if not same_name:
+                        del self._by_name[name]
+                # Only directories have children; for a file this finds nothing
+                stack.extend(self._children.pop(p, ()))
+
+    def _clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._children.clear()
+            self._by_name.clear()
+            self.truncated = False
+
+    def _watch_loop(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError:
+                self.live = False
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                self._handle_event(wd, mask, os.fsdecode(name))
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Kernel dropped events; rebuild from scratch
+            self.ready.clear()
+            self._clear()
+            for root in self.roots:
+                self._add_tree(root)
+            self.ready.set()
+            return
+        directory = self._watches.get(wd)
+        if directory is None:
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        if not name:
+            return
+        path = os.path.join(directory, name)
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self._remove(path)
+        elif mask & (IN_CREATE | IN_MOVED_TO) and mask & IN_ISDIR:
+            self._update(path)
+            if name not in SKIP_DIRS:
+                self._add_tree(path)
+        else:
+            self._update(path)
+
+    def covers(self, path):
+        """
+        True if path lies under an indexed root and the index can answer for
+        it: fully built, complete and kept fresh by inotify.
+        """
+        if not self.ready.is_set() or self.truncated or not self.live:
+            return False
+        path = os.path.abspath(os.path.expanduser(path))
+        return any(path == r or path.startswith(r.rstrip(os.sep) + os.sep) for r in self.roots)
+
+    def _subtree(self, directory, max_depth=None):
+        """Indexed paths below directory (to max_depth levels); the caller holds the lock"""
+        found = []
+        stack = [(directory, 0)]
+        while stack:
+            parent, depth = stack.pop()
+            if max_depth is not None and depth > max_depth:
+                continue
+            for path in self._children.get(parent, ()):
+                found.append(path)
+                stack.append((path, depth + 1))
+        return found
+
+    def search(self, pattern, root=None, max_results=50):
+        """
+        Search indexed paths. Patterns containing *, ? or [ are globs
+        (matched against the basename, or the full path if they contain /);
+        anything else is a case-insensitive substring match on the path.
+        """
+        tops = [os.path.abspath(os.path.expanduser(root)).rstrip(os.sep)] if root else self.roots
+        prefixes = tuple(top + os.sep for top in tops)
+
+        is_glob = any(c in pattern for c in '*?[')
+        needle = pattern.lower()
+
+        if '/' in pattern or (not is_glob and any(needle in prefix.lower() for prefix in prefixes)):
+            # The match can involve directory components: walk the subtree
+            with self._lock:
+                paths = [p for top in tops for p in self._subtree(top)]
+            if is_glob:
+                paths = fnmatch.filter(paths, pattern)
+            else:
+                paths = [p for p in paths if needle in p.lower()]
+        else:
+            # Otherwise only names decide: match distinct basenames, then
+            # take their paths (and, for substrings, what lies below them)
+            with self._lock:
+                names = list(self._by_name)
+            if is_glob:
+                names = fnmatch.filter(names, pattern)
+            else:
+                names = [n for n in names if needle in n.lower()]
+            with self._lock:
+                paths = set()
+                for name in names:
+                    for path in self._by_name.get(name, ()):
+                        if path.startswith(prefixes):
+                            paths.add(path)
+                            if not is_glob:
+                                paths.update(self._subtree(path))
+                paths = list(paths)
+
+        matches = []
+        with self._lock:
+            for path in heapq.nsmallest(max_results, paths):
+                meta = self.entries.get(path)
+                if meta is not None:
+                    is_dir, size, mtime = meta
+                    matches.append({"path": path, "is_directory": is_dir, "size_bytes": size, "mtime": mtime})
+        return matches, len(paths)
+
+    def config_files(self, directory, patterns, max_depth=2):
+        """Indexed equivalent of file_ops.find_config_files"""
+        top = os.path.abspath(os.path.expanduser(directory)).rstrip(os.sep)
+        with self._lock:
+            paths = [p for p in self._subtree(top, max_depth) if not self.entries[p][0]]
+        found = []
+        for path in sorted(paths):
+            name = os.path.basename(path).lower()
+            if any(pattern in name for pattern in patterns):
+                found.append(path)
+        return found
+
+
+_index = None
+
+
+def start_file_index(roots):
+    """Start the background index for the given roots (idempotent)"""
+    global _index
+    if _index is None and roots:
+        _index = FileIndex(roots)
+        if _index.roots:
+            _index.start()
+        else:
+            _index = None
+    return _index
+
+
+def get_file_index():
+    """Return the running FileIndex, or None if indexing is disabled"""
+    return _index
+
+
+def _walk_search(pattern, root, max_results, max_depth=6):
+    """Fallback search used when the path is not covered by the index"""
+    root = os.path.abspath(os.path.expanduser(root))
+    is_glob = any(c in pattern for c in '*?[')
+    match_full = '/' in pattern
+    needle = pattern.lower()
+    base_depth = root.rstrip(os.sep).count(os.sep)
+
+    matches = []
+    count = 0
+    for current, dirs, files in os.walk(root):
+        names = [(d, True) for d in dirs] + [(f, False) for f in files]
+        if current.count(os.sep) - base_depth >= max_depth:
+            dirs[:] = []
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name, is_dir in names:
+            path = os.path.join(current, name)
+            if is_glob:
+                if not fnmatch.fnmatch(path if match_full else name, pattern):
+                    continue
+            elif needle not in path.lower():
+                continue
+            count += 1
+            if len(matches) < max_results:
+                matches.append({"path": path, "is_directory": is_dir})
+    return matches, count
+
+
+def search_files(pattern, root=None, max_results=50):
+    """
+    Find files and directories by glob ('*.conf') or substring ('nginx').
+    Answers from the background index when available, otherwise walks root.
+    """
+    try:
+        search_root = root or os.getcwd()
+        index = get_file_index()
+        if index is not None and index.covers(search_root):
+            matches, count = index.search(pattern, search_root, max_results)
+            source = "index"
+        else:
+            if not os.path.isdir(os.path.expanduser(search_root)):
+                return {"error": f"Directory does not exist: {search_root}"}
+            matches, count = _walk_search(pattern, search_root, max_results)
+            source = "walk"
+        return {
+            "pattern": pattern,
+            "root": search_root,
+            "matches": matches,
+            "count": count,
+            "truncated": count > len(matches),
+            "source": source
+        }
+    except Exception as e:
+        return {"error": f"Error searching files: {str(e)}"}
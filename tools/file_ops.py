@@ -1,4 +1,6 @@
 import os
+from tools.file_index import get_file_index
+from tools.system_info import probe_path
 
 
 def read_config_file(path, max_lines=100):
@@ -44,39 +46,35 @@ def read_config_file(path, max_lines=100):
 def check_write_permission(path):
     """Check if the current user has write permission to a path"""
     try:
-        # Check if path exists
-        if os.path.exists(path):
-            writable = os.access(path, os.W_OK)
+        probe = probe_path(path)
+        if "error" in probe:
+            return {"error": f"Error checking permissions: {probe['error']}"}
+        
+        if probe["exists"]:
             return {
                 "path": path,
                 "exists": True,
-                "writable": writable
+                "writable": probe["writable"]
             }
+        result = {"path": path, "exists": False}
+        if probe.get("broken_symlink"):
+            result["broken_symlink"] = True
+        if probe["parent_exists"]:
+            # Parent directory decides whether a new file can be created
+            result["parent_writable"] = probe["can_create"]
+            result["can_create"] = probe["can_create"]
         else:
-            # Check parent directory for new file creation
-            parent = os.path.dirname(os.path.abspath(path))
-            if os.path.exists(parent):
-                writable = os.access(parent, os.W_OK)
-                return {
-                    "path": path,
-                    "exists": False,
-                    "parent_writable": writable,
-                    "can_create": writable
-                }
-            else:
-                return {
-                    "path": path,
-                    "exists": False,
-                    "error": "Parent directory does not exist"
-                }
+            result["error"] = "Parent directory does not exist"
+        return result
     except Exception as e:
         return {"error": f"Error checking permissions: {str(e)}"}
 
 
-def find_config_files(directory, config_patterns=None):
+def find_config_files(directory, config_patterns=None, max_depth=2):
     """
     Find configuration files in a directory.
     Looks for common config file patterns.
+    Answers from the background file index when it covers the directory.
     """
     if config_patterns is None:
         config_patterns = [
@@ -91,12 +89,23 @@ def find_config_files(directory, config_patterns=None):
         if not os.path.isdir(directory):
             return {"error": f"Path is not a directory: {directory}"}
         
+        index = get_file_index()
+        if index is not None and index.covers(directory):
+            config_files = index.config_files(directory, config_patterns, max_depth)
+            return {
+                "directory": directory,
+                "config_files": config_files[:50],  # Limit results
+                "count": len(config_files),
+                "source": "index"
+            }
+        
         config_files = []
+        base_depth = directory.rstrip(os.sep).count(os.sep)
         
         for root, dirs, files in os.walk(directory):
-            # Limit depth
-            if root.count(os.sep) - directory.count(os.sep) > 2:
-                continue
+            # Limit depth: prune here so os.walk never descends further
+            if root.rstrip(os.sep).count(os.sep) - base_depth >= max_depth:
+                dirs[:] = []
             
             for file in files:
                 file_lower = file.lower()
@@ -107,7 +116,8 @@ def find_config_files(directory, config_patterns=None):
         return {
             "directory": directory,
             "config_files": config_files[:50],  # Limit results
-            "count": len(config_files)
+            "count": len(config_files),
+            "source": "walk"
         }
         
     except Exception as e:
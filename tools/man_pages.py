@@ -1,4 +1,5 @@
 import subprocess
+from tools.command_catalog import get_command_catalog
 
 
 def get_man_page(command):
@@ -34,47 +35,21 @@ def get_man_page(command):
 def get_command_help(command):
     """
     Get --help output for a command.
-    Faster alternative to man pages.
+    Faster alternative to man pages. Served from the PATH catalog, which
+    runs the binary at most once per installed version.
     """
     try:
-        # Try --help first
-        result = subprocess.run(
-            [command, '--help'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        output = result.stdout + result.stderr
-        
-        if output.strip():
-            # Limit output
-            lines = output.split('\n')
-            if len(lines) > 300:
-                return '\n'.join(lines[:300]) + f"\n\n... (truncated, {len(lines) - 300} more lines)"
-            return output
-        
-        # Try -h as fallback
-        result = subprocess.run(
-            [command, '-h'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        catalog = get_command_catalog()
+        info = catalog.lookup(command)
+        if info is None:
+            return {"error": f"Command '{command}' not found"}
         
-        output = result.stdout + result.stderr
-        if output.strip():
-            lines = output.split('\n')
-            if len(lines) > 300:
-                return '\n'.join(lines[:300]) + f"\n\n... (truncated)"
+        output = catalog.help_text(info)
+        if output:
             return output
         
         return {"error": f"No help output available for '{command}'"}
         
-    except subprocess.TimeoutExpired:
-        return {"error": f"Timeout getting help for '{command}'"}
-    except FileNotFoundError:
-        return {"error": f"Command '{command}' not found"}
     except Exception as e:
         return {"error": f"Error getting help: {str(e)}"}
 
@@ -82,19 +57,14 @@ def get_command_help(command):
 def check_command_exists(command):
     """Check if a command exists on the system"""
     try:
-        result = subprocess.run(
-            ['which', command],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        info = get_command_catalog().lookup(command)
         
-        exists = result.returncode == 0
+        exists = info is not None
         
         return {
             "command": command,
             "exists": exists,
-            "path": result.stdout.strip() if exists else None
+            "path": info['path'] if exists else None
         }
     except Exception as e:
         return {"error": f"Error checking command: {str(e)}"}
@@ -0,0 +1,160 @@
+import os
+import time
+
+PROC = '/proc'
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+SORT_KEYS = {
+    'rss': lambda p: p['rss_mb'],
+    'memory': lambda p: p['rss_mb'],
+    'cpu': lambda p: p['cpu_percent'],
+    'pid': lambda p: -p['pid'],
+    'user': lambda p: p['user'],
+    'name': lambda p: p['name'],
+}
+
+_user_names = {}
+
+
+def _user_name(uid):
+    if uid not in _user_names:
+        try:
+            import pwd
+            _user_names[uid] = pwd.getpwuid(uid).pw_name
+        except (ImportError, KeyError):
+            _user_names[uid] = str(uid)
+    return _user_names[uid]
+
+
+def _read_stat(pid):
+    """Parse /proc/<pid>/stat; the command name may contain spaces and ')'"""
+    with open(f"{PROC}/{pid}/stat", 'rb') as f:
+        data = f.read()
+    open_paren = data.index(b'(')
+    close_paren = data.rindex(b')')
+    name = data[open_paren + 1:close_paren].decode('utf-8', 'replace')
+    fields = data[close_paren + 2:].split()
+    return {
+        'name': name,
+        'state': fields[0].decode(),
+        'ppid': int(fields[1]),
+        'cpu_ticks': int(fields[11]) + int(fields[12]),  # utime + stime
+        'threads': int(fields[17]),
+        'start_ticks': int(fields[19]),
+        'rss_pages': int(fields[21]),
+    }
+
+
+def _read_cmdline(pid, max_length=160):
+    try:
+        with open(f"{PROC}/{pid}/cmdline", 'rb') as f:
+            cmd = f.read(max_length * 2).replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+    return ' '.join(cmd.split())[:max_length]
+
+
+def _snapshot():
+    """One pass over /proc: pid -> (stat fields, uid)"""
+    snapshot = {}
+    with os.scandir(PROC) as it:
+        for entry in it:
+            if not entry.name.isdigit():
+                continue
+            pid = int(entry.name)
+            try:
+                snapshot[pid] = (_read_stat(pid), entry.stat().st_uid)
+            except (OSError, ValueError, IndexError):
+                continue  # Process exited mid-scan
+    return snapshot
+
+
+def list_processes(sort_by='rss', limit=20, user=None, name=None, min_rss_mb=None,
+                   min_cpu_percent=None, cpu_sample_seconds=0):
+    """
+    Snapshot running processes from /proc in one pass, filter and sort
+    them, and return the top `limit`. CPU% is the lifetime average unless
+    cpu_sample_seconds > 0, in which case it is measured over that interval.
+    """
+    if not os.path.isdir(f"{PROC}/self"):
+        return {"error": "Process listing requires /proc (Linux)"}
+    if sort_by not in SORT_KEYS:
+        return {"error": f"Unknown sort key '{sort_by}'. Use one of: {', '.join(SORT_KEYS)}"}
+
+    try:
+        with open(f"{PROC}/uptime", 'r') as f:
+            uptime = float(f.read().split()[0])
+        total_memory_kb = None
+        with open(f"{PROC}/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    total_memory_kb = int(line.split()[1])
+                    break
+
+        first = _snapshot()
+        elapsed = None
+        snapshot = first
+        if cpu_sample_seconds and cpu_sample_seconds > 0:
+            time.sleep(min(float(cpu_sample_seconds), 5.0))
+            elapsed = min(float(cpu_sample_seconds), 5.0)
+            snapshot = _snapshot()
+
+        name_filter = name.lower() if name else None
+        processes = []
+        for pid, (stat, uid) in snapshot.items():
+            rss_mb = stat['rss_pages'] * PAGE_SIZE / (1024 * 1024)
+            if min_rss_mb is not None and rss_mb < min_rss_mb:
+                continue
+            user_name = _user_name(uid)
+            if user is not None and user not in (user_name, str(uid)):
+                continue
+
+            cmd = None
+            if name_filter:
+                if name_filter not in stat['name'].lower():
+                    cmd = _read_cmdline(pid)
+                    if name_filter not in cmd.lower():
+                        continue
+
+            if elapsed:
+                previous = first.get(pid)
+                ticks = stat['cpu_ticks'] - (previous[0]['cpu_ticks'] if previous else 0)
+                cpu_percent = ticks / CLOCK_TICKS / elapsed * 100
+            else:
+                running = uptime - stat['start_ticks'] / CLOCK_TICKS
+                cpu_percent = stat['cpu_ticks'] / CLOCK_TICKS / running * 100 if running > 0 else 0.0
+            if min_cpu_percent is not None and cpu_percent < min_cpu_percent:
+                continue
+
+            processes.append({
+                "pid": pid,
+                "ppid": stat['ppid'],
+                "user": user_name,
+                "rss_mb": round(rss_mb, 1),
+                "mem_percent": round(stat['rss_pages'] * PAGE_SIZE / 1024 / total_memory_kb * 100, 1) if total_memory_kb else None,
+                "cpu_percent": round(cpu_percent, 1),
+                "state": stat['state'],
+                "threads": stat['threads'],
+                "name": stat['name'],
+                "cmd": cmd,
+            })
+
+        descending = sort_by not in ('user', 'name')
+        processes.sort(key=SORT_KEYS[sort_by], reverse=descending)
+        top = processes[:max(1, int(limit))]
+        # Command lines are only read for the rows actually returned
+        for process in top:
+            if process["cmd"] is None:
+                process["cmd"] = _read_cmdline(process["pid"])
+
+        return {
+            "total_processes": len(snapshot),
+            "matched": len(processes),
+            "sort_by": sort_by,
+            "cpu_percent_basis": f"{elapsed}s sample" if elapsed else "lifetime average",
+            "processes": top
+        }
+    except Exception as e:
+        return {"error": f"Error listing processes: {str(e)}"}
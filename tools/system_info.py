@@ -1,70 +1,171 @@
+import bisect
+import json
 import os
 import subprocess
 import platform
 import shutil
+import sqlite3
+import stat
+import struct
 from pathlib import Path
 
 
-def get_file_tree(path, max_depth=3):
+def _tree_name(name):
+    """A name as written in the tree: JSON-quoted if it could be misread"""
+    if name == '...' or name.startswith('"') or any(c.isspace() or c in '\\' or not c.isprintable() for c in name):
+        return json.dumps(name, ensure_ascii=False)
+    return name
+
+
+def get_file_tree(path, max_depth=3, max_entries=500):
     """
     Get directory structure without assuming.
-    Returns the tree as a string or error dict.
+    Returns the tree as a string or error dict: the root path, then one
+    line per directory ("relative/dir/: entry entry subdir/ ...") so each
+    directory's path is written only once. Entries are separated by spaces;
+    names containing whitespace, quotes or backslashes are JSON-quoted.
     """
     if not os.path.exists(path):
         return {"error": f"Path {path} does not exist"}
     
     tree = []
+    entries = 0
     try:
         path = os.path.abspath(path)
         tree.append(f"{path}/")
         
         for root, dirs, files in os.walk(path):
-            level = root.replace(path, '').count(os.sep)
+            rel = os.path.relpath(root, path)
+            level = 0 if rel == '.' else rel.count(os.sep) + 1
             if level >= max_depth:
                 dirs[:] = []  # Don't descend further
                 continue
             
-            indent = '  ' * (level + 1)
-            
-            # Show directories
-            for d in sorted(dirs):
-                tree.append(f"{indent}{d}/")
+            dirs.sort()
+            names = [_tree_name(f"{d}/") for d in dirs] + [_tree_name(f) for f in sorted(files)]
+            if not names:
+                continue
             
-            # Show files
-            for f in sorted(files):
-                tree.append(f"{indent}{f}")
+            label = './' if rel == '.' else _tree_name(f"{rel}/")
+            remaining = max_entries - entries
+            if len(names) > remaining:
+                names = names[:remaining] + ["..."]
+            tree.append(f"{label}: {' '.join(names)}")
+            entries += len(names)
+            if entries >= max_entries:
+                tree.append(f"... (truncated at {max_entries} entries)")
+                break
                 
     except PermissionError as e:
         return {"error": f"Permission denied: {path}"}
     except Exception as e:
         return {"error": f"Error reading directory: {str(e)}"}
     
-    return "\n".join(tree[:500])  # Limit output
+    return "\n".join(tree)
+
+
+_owner_cache = {}
+
+
+def _owner_name(uid):
+    """Resolve a uid to a user name, falling back to the numeric id"""
+    if uid not in _owner_cache:
+        try:
+            import pwd
+            _owner_cache[uid] = pwd.getpwuid(uid).pw_name
+        except (ImportError, KeyError):
+            _owner_cache[uid] = str(uid)
+    return _owner_cache[uid]
+
+
+def _creatable(result, target):
+    """Record whether target's directory exists and a file can be created in it"""
+    parent = os.path.dirname(target)
+    parent_exists = os.path.isdir(parent)
+    result["parent_exists"] = parent_exists
+    result["can_create"] = parent_exists and os.access(parent, os.W_OK)
+    return result
+
+
+def probe_path(path):
+    """
+    Stat a single path: existence, type, size, mode, owner and access bits.
+    Uses one lstat (plus a stat for symlinks) and os.access per bit. Paths
+    that do not exist (including broken symlinks) report whether they
+    could be created instead.
+    """
+    abs_path = os.path.abspath(os.path.expanduser(path))
+    result = {"path": abs_path, "exists": False}
+    
+    try:
+        st = os.lstat(abs_path)
+    except FileNotFoundError:
+        return _creatable(result, abs_path)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+    
+    is_symlink = stat.S_ISLNK(st.st_mode)
+    if is_symlink:
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            result["is_symlink"] = True
+            result["broken_symlink"] = True
+            # Writing through the link creates its target
+            return _creatable(result, os.path.realpath(abs_path))
+    
+    if stat.S_ISDIR(st.st_mode):
+        path_type = "directory"
+    elif stat.S_ISREG(st.st_mode):
+        path_type = "file"
+    else:
+        path_type = "other"
+    
+    result.update({
+        "exists": True,
+        "type": path_type,
+        "is_symlink": is_symlink,
+        "size_bytes": st.st_size,
+        "mode": f"{stat.S_IMODE(st.st_mode):04o}",
+        "owner": _owner_name(st.st_uid),
+        "readable": os.access(abs_path, os.R_OK),
+        "writable": os.access(abs_path, os.W_OK),
+        "executable": os.access(abs_path, os.X_OK),
+    })
+    return result
+
+
+def probe_paths(paths, max_paths=100):
+    """Probe many paths in one call (see probe_path)"""
+    if isinstance(paths, str):
+        paths = [paths]
+    results = [probe_path(p) for p in paths[:max_paths]]
+    return {
+        "results": results,
+        "count": len(results),
+        "missing": [r["path"] for r in results if not r["exists"]],
+        "truncated": len(paths) > max_paths
+    }
 
 
 def check_file_exists(path):
     """Check if a file or directory exists"""
-    abs_path = os.path.abspath(path)
-    exists = os.path.exists(abs_path)
+    probe = probe_path(path)
     
     result = {
-        "path": abs_path,
-        "exists": exists
+        "path": probe["path"],
+        "exists": probe["exists"]
     }
     
-    if exists:
-        result["is_file"] = os.path.isfile(abs_path)
-        result["is_directory"] = os.path.isdir(abs_path)
-        result["is_symlink"] = os.path.islink(abs_path)
-        
-        try:
-            stat = os.stat(abs_path)
-            result["size_bytes"] = stat.st_size
-            result["readable"] = os.access(abs_path, os.R_OK)
-            result["writable"] = os.access(abs_path, os.W_OK)
-            result["executable"] = os.access(abs_path, os.X_OK)
-        except:
-            pass
+    if probe["exists"]:
+        result["is_file"] = probe["type"] == "file"
+        result["is_directory"] = probe["type"] == "directory"
+        result["is_symlink"] = probe["is_symlink"]
+        result["size_bytes"] = probe["size_bytes"]
+        result["readable"] = probe["readable"]
+        result["writable"] = probe["writable"]
+        result["executable"] = probe["executable"]
     
     return result
 
@@ -149,6 +250,160 @@ def get_disk_space(path="/"):
         return {"error": f"Error getting disk space: {str(e)}"}
 
 
+# Package databases, checked in order
+DPKG_STATUS = '/var/lib/dpkg/status'
+APK_INSTALLED = '/lib/apk/db/installed'
+RPM_SQLITE = '/var/lib/rpm/rpmdb.sqlite'
+RPM_SQLITE_ALT = '/usr/lib/sysimage/rpm/rpmdb.sqlite'
+
+# rpm header tags
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_ARCH = 1022
+
+# db path -> (mtime, manager, sorted names, {name: [(version, arch), ...]})
+_package_cache = {}
+
+
+def _parse_dpkg_status(path):
+    packages = {}
+    fields = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in list(f) + ['\n']:
+            if line == '\n':
+                if fields.get('Status', '').endswith(' installed') and 'Package' in fields:
+                    packages.setdefault(fields['Package'], []).append(
+                        (fields.get('Version', ''), fields.get('Architecture', ''))
+                    )
+                fields = {}
+            elif not line[0].isspace() and ':' in line:
+                key, _, value = line.partition(':')
+                if key in ('Package', 'Status', 'Version', 'Architecture'):
+                    fields[key] = value.strip()
+    return packages
+
+
+def _parse_apk_installed(path):
+    packages = {}
+    fields = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in list(f) + ['\n']:
+            if line == '\n':
+                if 'P' in fields:
+                    packages.setdefault(fields['P'], []).append((fields.get('V', ''), fields.get('A', '')))
+                fields = {}
+            elif len(line) > 2 and line[1] == ':' and line[0] in 'PVA':
+                fields[line[0]] = line[2:].strip()
+    return packages
+
+
+def _rpm_header_tags(blob, wanted):
+    """Read string/int32 tags from a raw rpm header blob"""
+    index_count, data_length = struct.unpack('>II', blob[:8])
+    data_start = 8 + index_count * 16
+    values = {}
+    for i in range(index_count):
+        tag, tag_type, offset, count = struct.unpack('>IIII', blob[8 + i * 16:24 + i * 16])
+        if tag not in wanted:
+            continue
+        position = data_start + offset
+        if tag_type == 4:  # INT32
+            values[tag] = struct.unpack('>I', blob[position:position + 4])[0]
+        elif tag_type in (6, 8, 9):  # STRING, STRING_ARRAY, I18NSTRING
+            end = blob.index(b'\0', position)
+            values[tag] = blob[position:end].decode('utf-8', 'replace')
+    return values
+
+
+def _parse_rpm_sqlite(path):
+    packages = {}
+    wanted = {RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for (blob,) in conn.execute("SELECT blob FROM Packages"):
+            tags = _rpm_header_tags(bytes(blob), wanted)
+            if RPMTAG_NAME not in tags:
+                continue
+            version = f"{tags.get(RPMTAG_VERSION, '')}-{tags.get(RPMTAG_RELEASE, '')}"
+            if tags.get(RPMTAG_EPOCH):
+                version = f"{tags[RPMTAG_EPOCH]}:{version}"
+            packages.setdefault(tags[RPMTAG_NAME], []).append((version, tags.get(RPMTAG_ARCH, '')))
+    finally:
+        conn.close()
+    return packages
+
+
+def _load_package_index():
+    """Installed-package index for this system, re-parsed only when the db changes"""
+    for db_path, manager, parser in (
+        (DPKG_STATUS, 'dpkg', _parse_dpkg_status),
+        (APK_INSTALLED, 'apk', _parse_apk_installed),
+        (RPM_SQLITE, 'rpm', _parse_rpm_sqlite),
+        (RPM_SQLITE_ALT, 'rpm', _parse_rpm_sqlite),
+    ):
+        try:
+            mtime = os.stat(db_path).st_mtime
+        except OSError:
+            continue
+        cached = _package_cache.get(db_path)
+        if cached and cached[0] == mtime:
+            return cached[1:]
+        packages = parser(db_path)
+        _package_cache[db_path] = (mtime, manager, sorted(packages), packages)
+        return _package_cache[db_path][1:]
+    return None
+
+
+def query_packages(names=None, prefix=None, max_results=50):
+    """
+    Look up installed packages by exact name and/or name prefix, reading
+    the dpkg, apk or rpm database directly instead of running the package
+    manager.
+    """
+    try:
+        index = _load_package_index()
+        if index is None:
+            return {"error": "No supported package database found (dpkg, apk or rpm sqlite)"}
+        manager, names_sorted, packages = index
+        
+        result = {"manager": manager, "installed_count": len(packages)}
+        
+        if isinstance(names, str):
+            names = [names]
+        if names:
+            lookups = []
+            for name in names[:max_results]:
+                versions = packages.get(name)
+                if versions:
+                    lookups.append({
+                        "name": name,
+                        "installed": True,
+                        "versions": [f"{v} ({a})" if a else v for v, a in versions]
+                    })
+                else:
+                    lookups.append({"name": name, "installed": False})
+            result["packages"] = lookups
+        
+        if prefix:
+            start = bisect.bisect_left(names_sorted, prefix)
+            matches = []
+            for name in names_sorted[start:]:
+                if not name.startswith(prefix):
+                    break
+                matches.append(name)
+            result["prefix"] = prefix
+            result["matches"] = [
+                {"name": name, "version": packages[name][0][0]} for name in matches[:max_results]
+            ]
+            result["match_count"] = len(matches)
+        
+        return result
+    except Exception as e:
+        return {"error": f"Error reading package database: {str(e)}"}
+
+
 def get_system_info():
     """Get basic system information"""
     try:
@@ -173,8 +428,21 @@ def get_system_info():
         return {"error": f"Error getting system info: {str(e)}"}
 
 
+_platform_info = None
+
+
 def get_platform_info():
-    """Get OS and shell information for command generation context"""
+    """
+    Get OS and shell information for command generation context.
+    Detected once per process; callers get their own copy.
+    """
+    global _platform_info
+    if _platform_info is None:
+        _platform_info = _detect_platform_info()
+    return dict(_platform_info)
+
+
+def _detect_platform_info():
     info = {}
     
     # Detect OS
@@ -54,6 +54,29 @@ def validate_command_safety(command):
     }
 
 
+# Commands that delete, overwrite, stop or otherwise change things. A command
+# matching one of these is never suggested from memory of an earlier task.
+DESTRUCTIVE_PATTERNS = [
+    r'\b(rm|rmdir|unlink|shred|truncate|dd|mkfs(\.\w+)?|fdisk|parted|wipefs)\b',
+    r'(^|[;&|]\s*|\bsudo\s+)(mv|cp)\b',
+    r'-delete\b|--delete\b|--remove\b|-exec\s+rm\b|\bxargs\s+(-\S+\s+)*rm\b',
+    r'\b(kill|pkill|killall|reboot|shutdown|halt|poweroff)\b',
+    r'\b(chmod|chown|chgrp|chattr|setfacl)\b',
+    r'\bsystemctl\s+(stop|disable|mask|kill|restart)\b',
+    r'\b(apt|apt-get|yum|dnf|pacman|zypper|apk|pip|npm|brew)\s+(remove|purge|erase|uninstall|autoremove|del)\b',
+    r'\b(userdel|groupdel|deluser|crontab\s+-r)\b',
+    r'\bgit\s+(reset|clean|push\s+.*--force|checkout\s+--)\b',
+    r'\b(drop|truncate|delete\s+from)\b',
+    r'\bsed\s+(-\S+\s+)*-i',
+    r'(?<![0-9&])>(?!\s*/dev/null)(?!&)',
+]
+
+
+def is_destructive(command):
+    """Whether a command may delete, overwrite or stop something"""
+    return any(re.search(pattern, command, re.IGNORECASE) for pattern in DESTRUCTIVE_PATTERNS)
+
+
 def parse_command_intent(command):
     """
     Parse a command to understand what it does.